@@ -0,0 +1,137 @@
+# agents/_llm.py
+import functools
+import logging
+import os
+from contextlib import aclosing, closing, contextmanager
+from typing import Optional
+
+from dotenv import load_dotenv
+from gigachat import GigaChat
+from gigachat.context import session_id_cvar
+from pydantic_core import from_json
+
+# .env читается один раз на процесс — там, где нужны ключи GigaChat
+load_dotenv()
+
+logger = logging.getLogger(__name__)
+
+# Размер пула соединений httpx внутри SDK — общий для всех агентов процесса
+MAX_CONNECTIONS = 32
+
+# Созданные клиенты — чтобы закрыть их соединения при остановке бота
+_CLIENTS = []
+
+
+@functools.lru_cache(maxsize=None)
+def get_gigachat(model: str = "GigaChat") -> GigaChat:
+    """
+    Возвращает общий для процесса клиент GigaChat.
+
+    SDK держит долгоживущий httpx-клиент с keep-alive и кэширует OAuth-токен,
+    поэтому переиспользование одного экземпляра избавляет каждый запрос
+    от TLS-рукопожатия и похода за токеном. Сетевых запросов при создании нет:
+    функция вызывается и из async-обработчиков, токен заранее получает awarm_gigachat.
+    """
+    llm = GigaChat(
+        credentials=os.getenv("GIGACHAT_CLIENT_SECRET"),
+        verify_ssl_certs=False,
+        model=model,
+        max_connections=MAX_CONNECTIONS
+    )
+
+    _CLIENTS.append(llm)
+    return llm
+
+
+async def awarm_gigachat(model: str = "GigaChat"):
+    """
+    Получает токен и открывает соединение при старте бота, а не на первом запросе пользователя.
+
+    Дальше SDK сам обновляет токен, когда он истекает.
+    """
+    if not os.getenv("GIGACHAT_CLIENT_SECRET"):
+        return
+
+    try:
+        await get_gigachat(model).aget_token()
+    except Exception as e:
+        logger.warning("Не удалось заранее получить токен GigaChat: %s", e)
+
+
+async def aclose_gigachat():
+    """Закрывает пулы соединений всех клиентов GigaChat (вызывается при остановке бота)"""
+    get_gigachat.cache_clear()
+    while _CLIENTS:
+        llm = _CLIENTS.pop()
+        llm.close()
+        await llm.aclose()
+
+
+@contextmanager
+def prompt_cache_session(session_id: Optional[str]):
+    """
+    Передает в запросы GigaChat заголовок X-Session-ID.
+
+    Для запросов одной сессии GigaChat кэширует совпадающее начало промпта,
+    поэтому статичная часть (инструкции, схема ответа) не обрабатывается
+    моделью заново. id должен быть свой у каждого пользователя: запросы с одним
+    id GigaChat считает одним диалогом. Без id (None) заголовок не передается.
+    Работает и для async-вызовов: значение хранится в contextvar.
+    """
+    if not session_id:
+        yield
+        return
+
+    token = session_id_cvar.set(session_id)
+    try:
+        yield
+    finally:
+        session_id_cvar.reset(token)
+
+
+def _json_complete(parts: list, delta: str) -> bool:
+    """Пришел ли в потоке полностью JSON-объект (проверяется, только когда в куске есть "}")"""
+    if "}" not in delta:
+        return False
+
+    text = "".join(parts)
+    start = text.find("{")
+    # Объект внутри списка — это еще не конец ответа, дочитываем поток целиком
+    if start == -1 or "[" in text[:start]:
+        return False
+    try:
+        from_json(text[start:text.rfind("}") + 1])
+    except ValueError:
+        return False
+    return True
+
+
+def stream_until_json(llm: GigaChat, prompt: str) -> str:
+    """
+    Читает потоковый ответ GigaChat до закрывающей скобки JSON-объекта.
+
+    Пояснения, которые модель дописывает после JSON, уже не ждем:
+    поток закрывается, как только объект полностью получен.
+    """
+    parts = []
+    with closing(llm.stream(prompt)) as stream:
+        for chunk in stream:
+            delta = chunk.choices[0].delta.content or ""
+            parts.append(delta)
+            if _json_complete(parts, delta):
+                break
+
+    return "".join(parts)
+
+
+async def astream_until_json(llm: GigaChat, prompt: str) -> str:
+    """Асинхронная версия stream_until_json"""
+    parts = []
+    async with aclosing(llm.astream(prompt)) as stream:
+        async for chunk in stream:
+            delta = chunk.choices[0].delta.content or ""
+            parts.append(delta)
+            if _json_complete(parts, delta):
+                break
+
+    return "".join(parts)
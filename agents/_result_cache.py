@@ -0,0 +1,61 @@
+# agents/_result_cache.py
+import hashlib
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Optional, Tuple
+
+
+def _normalize(text: str) -> str:
+    return " ".join(text.lower().split())
+
+
+def _digest(key: Tuple[Any, ...]) -> str:
+    """sha256 от нормализованных частей ключа"""
+    joined = "\0".join(_normalize(str(part)) for part in key)
+    return hashlib.sha256(joined.encode()).hexdigest()
+
+
+class ResultCache:
+    """
+    Точный LRU-кэш результатов LLM с TTL.
+
+    Ключ — кортеж всего, от чего зависит промпт (вопрос, уровень, ответ и т.д.);
+    части сравниваются с точностью до регистра и пробелов, в памяти хранится
+    только их sha256. В отличие от SemanticCache похожий, но другой ответ —
+    промах: оценка относится к конкретному ответу и не должна доставаться
+    другому пользователю.
+    """
+
+    def __init__(self, maxsize: int = 10_000, ttl: float = 3600):
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self._lock = threading.Lock()
+        # sha256 ключа -> (значение, момент истечения); порядок = порядок LRU
+        self._entries: "OrderedDict[str, Tuple[Any, float]]" = OrderedDict()
+
+    def get(self, key: Tuple[Any, ...]) -> Optional[Any]:
+        """Сохраненный результат для ключа или None"""
+        digest = _digest(key)
+        with self._lock:
+            entry = self._entries.get(digest)
+            if entry is None:
+                return None
+            if entry[1] <= time.monotonic():
+                del self._entries[digest]
+                return None
+            self._entries.move_to_end(digest)
+            return entry[0]
+
+    def put(self, key: Tuple[Any, ...], value: Any):
+        """Сохраняет результат для ключа"""
+        digest = _digest(key)
+        with self._lock:
+            self._entries.pop(digest, None)
+            while len(self._entries) >= self.maxsize:
+                self._entries.popitem(last=False)
+            self._entries[digest] = (value, time.monotonic() + self.ttl)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
@@ -0,0 +1,168 @@
+# agents/_session_store.py
+import os
+import threading
+import time
+from typing import Any, Dict, Optional, Protocol, Tuple, Union
+
+from pydantic import TypeAdapter
+
+# Клиент Redis (если установлен)
+try:
+    import redis
+    import redis.asyncio
+
+    REDIS_AVAILABLE = True
+except ImportError:
+    REDIS_AVAILABLE = False
+
+# Сколько живет неактивная сессия интервью, секунд
+SESSION_TTL = 2 * 60 * 60
+
+
+class SessionStore(Protocol):
+    """
+    Хранилище сессий интервью: get/put/delete по id сессии.
+
+    Асинхронные aget/aput/adelete — для обработчиков бота: не блокируют event loop.
+    id приводится к str на входе, так что подходит и целочисленный ключ из БД.
+    """
+
+    def get(self, session_id: Union[str, int]) -> Optional[Any]:
+        ...
+
+    def put(self, session: Any):
+        ...
+
+    def delete(self, session_id: Union[str, int]):
+        ...
+
+    async def aget(self, session_id: Union[str, int]) -> Optional[Any]:
+        ...
+
+    async def aput(self, session: Any):
+        ...
+
+    async def adelete(self, session_id: Union[str, int]):
+        ...
+
+
+class MemorySessionStore:
+    """
+    Сессии в памяти процесса — вариант по умолчанию для одного воркера.
+
+    Каждая запись живет ttl секунд с последнего put, так что брошенные
+    интервью не копятся в памяти до перезапуска бота; сверх maxsize
+    вытесняются сессии, которые дольше всех не сохранялись. Сессии разложены
+    по шардам со своими блокировками: параллельные запросы разных
+    пользователей почти не ждут друг друга, а очистка истекших записей
+    проходит только по одному шарду.
+    """
+
+    def __init__(self, ttl: float = SESSION_TTL, maxsize: int = 10_000, shards: int = 16):
+        self.ttl = ttl
+        self._shard_size = max(1, maxsize // shards)
+        # Шард: (session_id -> (сессия, момент истечения), блокировка)
+        self._shards = [({}, threading.Lock()) for _ in range(shards)]
+
+    def _shard(self, session_id: str) -> Tuple[Dict[str, Tuple[Any, float]], threading.Lock]:
+        return self._shards[hash(session_id) % len(self._shards)]
+
+    def get(self, session_id: Union[str, int]) -> Optional[Any]:
+        session_id = str(session_id)
+        sessions, lock = self._shard(session_id)
+        with lock:
+            entry = sessions.get(session_id)
+            if entry is None:
+                return None
+            if entry[1] <= time.monotonic():
+                del sessions[session_id]
+                return None
+            return entry[0]
+
+    def put(self, session: Any):
+        session_id = str(session.id)
+        sessions, lock = self._shard(session_id)
+        with lock:
+            now = time.monotonic()
+            # Заодно вычищаем истекшие сессии шарда
+            expired = [key for key, (_, expires_at) in sessions.items() if expires_at <= now]
+            for key in expired:
+                del sessions[key]
+
+            # Переставляем в конец: порядок ключей шарда — порядок последнего put
+            sessions.pop(session_id, None)
+            while len(sessions) >= self._shard_size:
+                del sessions[next(iter(sessions))]
+            sessions[session_id] = (session, now + self.ttl)
+
+    def delete(self, session_id: Union[str, int]):
+        session_id = str(session_id)
+        sessions, lock = self._shard(session_id)
+        with lock:
+            sessions.pop(session_id, None)
+
+    # Операции в памяти не ждут ввода-вывода — async-версии просто вызывают синхронные
+    async def aget(self, session_id: Union[str, int]) -> Optional[Any]:
+        return self.get(session_id)
+
+    async def aput(self, session: Any):
+        self.put(session)
+
+    async def adelete(self, session_id: Union[str, int]):
+        self.delete(session_id)
+
+
+class RedisSessionStore:
+    """
+    Сессии в Redis: переживают перезапуск и доступны всем воркерам бота.
+
+    Сессия хранится как JSON (через TypeAdapter, так что подходит и модель
+    pydantic, и dataclass), TTL обновляется на каждом put.
+    После изменения полученной сессии ее нужно снова сохранить через put.
+    Синхронные методы ходят через redis.Redis, асинхронные — через redis.asyncio,
+    чтобы обработчики бота не блокировали event loop на сетевом запросе.
+    """
+
+    def __init__(self, url: str, model: type, ttl: int = SESSION_TTL,
+                 prefix: str = "interview:session:"):
+        self._adapter = TypeAdapter(model)
+        self.ttl = ttl
+        self.prefix = prefix
+        self._redis = redis.Redis.from_url(url)
+        self._aredis = redis.asyncio.Redis.from_url(url)
+
+    def _key(self, session_id: Union[str, int]) -> str:
+        return f"{self.prefix}{session_id}"
+
+    def _load(self, raw: Optional[bytes]) -> Optional[Any]:
+        if raw is None:
+            return None
+        return self._adapter.validate_json(raw)
+
+    def get(self, session_id: Union[str, int]) -> Optional[Any]:
+        return self._load(self._redis.get(self._key(session_id)))
+
+    def put(self, session: Any):
+        self._redis.set(self._key(session.id), self._adapter.dump_json(session), ex=self.ttl)
+
+    def delete(self, session_id: Union[str, int]):
+        self._redis.delete(self._key(session_id))
+
+    async def aget(self, session_id: Union[str, int]) -> Optional[Any]:
+        return self._load(await self._aredis.get(self._key(session_id)))
+
+    async def aput(self, session: Any):
+        await self._aredis.set(self._key(session.id), self._adapter.dump_json(session), ex=self.ttl)
+
+    async def adelete(self, session_id: Union[str, int]):
+        await self._aredis.delete(self._key(session_id))
+
+
+def default_session_store(model: type) -> SessionStore:
+    """Redis, если задан REDIS_URL и установлен клиент, иначе память процесса"""
+    url = os.getenv("REDIS_URL")
+    if url and REDIS_AVAILABLE:
+        return RedisSessionStore(url, model)
+    if url:
+        print("⚠️  REDIS_URL задан, но пакет redis не установлен. Сессии хранятся в памяти.")
+    return MemorySessionStore()
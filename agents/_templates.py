@@ -0,0 +1,50 @@
+# agents/_templates.py
+import keyword
+from string import Formatter
+from typing import Callable, Dict
+
+# Скомпилированные функции, ключ — исходный текст шаблона
+_COMPILED: Dict[str, Callable[..., str]] = {}
+
+
+def compile_template(template: str) -> Callable[..., str]:
+    """
+    Превращает str.format-шаблон в функцию с именованными аргументами.
+
+    Шаблон разбирается один раз: статические куски становятся строковыми
+    литералами в коде функции, а сама функция только склеивает их с подставляемыми
+    значениями через "".join — без повторного разбора фигурных скобок на каждом
+    вызове. Других имен, кроме полей шаблона, в функции нет, так что поле
+    с любым именем не перекроет служебное. Результат совпадает с template.format(**kwargs).
+    """
+    compiled = _COMPILED.get(template)
+    if compiled is not None:
+        return compiled
+
+    parts = []
+    fields = []
+
+    for literal, field, spec, conversion in Formatter().parse(template):
+        if literal:
+            parts.append(repr(literal))
+
+        if field is not None:
+            if spec or conversion or not field.isidentifier() or keyword.iskeyword(field):
+                raise ValueError(f"Неподдерживаемое поле шаблона: {{{field}}}")
+            # f"{x}" вызывает format(x, "") — как и str.format
+            parts.append(f'f"{{{field}}}"')
+            if field not in fields:
+                fields.append(field)
+
+    if not parts:
+        parts.append('""')
+
+    signature = f"*, {', '.join(fields)}" if fields else ""
+    source = f"def _fmt({signature}):\n    return \"\".join(({', '.join(parts)},))\n"
+
+    namespace = {}
+    exec(source, namespace)
+    compiled = namespace["_fmt"]
+
+    _COMPILED[template] = compiled
+    return compiled
@@ -1,37 +1,35 @@
 # agents/assessor.py
-import json
-import sys
-from pathlib import Path
-from pydantic import BaseModel
-from gigachat import GigaChat
+import asyncio
+import logging
 import os
-from dotenv import load_dotenv
-from typing import List, Dict, Optional
+import re
+from functools import cached_property
+from pydantic import BaseModel, ConfigDict, TypeAdapter
+from pydantic_core import from_json
+from typing import List, Dict, Optional, Tuple
 
-# Добавляем путь для импорта RAG
-sys.path.append(str(Path(__file__).resolve().parent.parent))
+from agents._llm import astream_until_json, get_gigachat, prompt_cache_session
+from agents._result_cache import ResultCache
+from agents._templates import compile_template
 
-# Импортируем RAG (с обработкой ошибок)
+logger = logging.getLogger(__name__)
+
+# Черновой локальный оценщик (модель scikit-learn, сохраненная через joblib)
 try:
-    from rag.retriever import retrieve_context
+    import joblib
 
-    RAG_AVAILABLE = True
+    DRAFT_AVAILABLE = True
 except ImportError:
-    print("⚠️  RAG модуль не найден. Assessor будет работать без базы знаний.")
-    RAG_AVAILABLE = False
-
-
-    def retrieve_context(query: str, k: int = 4) -> List[str]:
-        return []
-
-# Загружаем токен из .env
-load_dotenv()
+    DRAFT_AVAILABLE = False
 
 
 # ===============================
 #  Модель данных для результата
 # ===============================
 class AssessResult(BaseModel):
+    # Неизменяемый: готовые экземпляры (кэш, результаты по умолчанию) отдаются нескольким вызывающим
+    model_config = ConfigDict(frozen=True)
+
     scores: dict
     weak_topics: list
     follow_up: str
@@ -39,133 +37,338 @@ class AssessResult(BaseModel):
     context_used: Optional[bool] = False
 
 
+# Ключевые слова во фрагментах базы знаний -> тема-пример для промпта
+_EXAMPLE_TOPICS = {
+    "python": "Python",
+    "алгоритм": "Алгоритмы",
+    "база данных": "Базы данных",
+}
+# Один проход по фрагменту вместо отдельного поиска (и .lower()) на каждое слово
+_EXAMPLE_TOPICS_RE = re.compile("|".join(map(re.escape, _EXAMPLE_TOPICS)), re.IGNORECASE)
+
+# Скомпилированный валидатор pydantic-core, переиспользуется всеми вызовами
+_ASSESS_ADAPTER = TypeAdapter(AssessResult)
+
+# Промпты оценки: сначала неизменная часть (инструкции и схема ответа), данные пользователя — в конце.
+# Одинаковое начало запросов позволяет GigaChat переиспользовать кэш контекста.
+_PROMPT_WITHOUT_RAG = """
+Ты — эксперт по техническим собеседованиям и оценке знаний.
+
+Всегда:
+- давай явный вердикт по готовности к собеседованиям;
+- объясняй, что означают выставленные баллы и какие темы проседают;
+- предлагай конкретные следующие шаги.
+
+Даже если запрос сформулирован общо, всё равно сделай разумное предположение и дай вердикт по готовности.
+
+Верни строго JSON:
+{{
+  "scores": {{
+    "theory": int,            # теоретическая база (0-100)
+    "practice": int,          # практический опыт (0-100)
+    "interview_readiness": int # готовность к собеседованию (0-100)
+  }},
+  "weak_topics": ["конкретные слабые темы"],
+  "follow_up": "уточняющий вопрос для следующего шага",
+  "feedback": "конструктивный разбор: что уже ок, что мешает собеседованиям и что делать дальше"
+}}
+
+Темы для оценки: {topics}
+
+Ответ пользователя: {answer}
+"""
+
+_PROMPT_WITH_RAG = """
+Ты — эксперт по техническим собеседованиям. Используй информацию из базы знаний, но не цитируй её дословно.
+
+Всегда:
+- давай явный вердикт по готовности к собеседованиям;
+- используй контекст только как подсказку, но отвечай применительно к пользователю;
+- объясняй, что означают выставленные баллы и какие темы проседают;
+- предлагай конкретные следующие шаги.
+
+Верни строго JSON:
+{{
+  "scores": {{
+    "theory": int,            # теоретическая база (0-100)
+    "practice": int,          # практический опыт (0-100)
+    "interview_readiness": int # готовность к собеседованию (0-100)
+  }},
+  "weak_topics": ["конкретные слабые темы"],
+  "follow_up": "уточняющий вопрос для следующего шага",
+  "feedback": "конструктивный разбор: что уже ок, что мешает собеседованиям и что делать дальше"
+}}
+
+КОНТЕКСТ ПОЛЬЗОВАТЕЛЯ:
+- Уровень: {level}
+- Направление: {track}
+- Текущий вопрос: {question}
+
+КОНТЕКСТ ИЗ БАЗЫ ЗНАНИЙ (примеры вопросов и тем):
+{rag_context}
+
+Темы для оценки: {topics}
+
+Ответ пользователя: {answer}
+"""
+
+# Шаблоны разбираются один раз при импорте, дальше только склейка строк
+_fmt_without_rag = compile_template(_PROMPT_WITHOUT_RAG)
+_fmt_with_rag = compile_template(_PROMPT_WITH_RAG)
+
+# Промпт расширенной оценки: статичный текст разбирается один раз при импорте
+_FEEDBACK_PROMPT = """
+Оцени ответ на технический вопрос.
+
+КОНТЕКСТ:
+- Уровень: {level}
+- Направление: {track}
+
+Вопрос: {question}
+Ответ пользователя: {user_answer}
+{correct_answer_line}
+{context_line}
+
+Проанализируй ответ по критериям:
+1. Техническая точность (0-40)
+2. Полнота ответа (0-30)  
+3. Структура и ясность (0-20)
+4. Примеры и детали (0-10)
+
+Верни строго JSON:
+{{
+    "total_score": 0-100,
+    "criteria_scores": {{
+        "accuracy": 0-40,
+        "completeness": 0-30,
+        "clarity": 0-20,
+        "examples": 0-10
+    }},
+    "strengths": ["сильные стороны"],
+    "improvements": ["что улучшить"],
+    "recommended_resources": ["ресурсы для изучения"]
+}}
+"""
+_fmt_feedback = compile_template(_FEEDBACK_PROMPT)
+
+# Черновой оценщик: путь к модели (только явно, без значения по умолчанию —
+# joblib.load исполняет код из файла) и порог уверенности, выше которого LLM не вызывается
+_DRAFT_SCORER_PATH = os.getenv("ASSESSOR_DRAFT_SCORER")
+_DRAFT_CONFIDENCE = 0.8
+
+# Ответы короче этого (без пробелов по краям) не отправляются ни в RAG, ни в LLM
+_MIN_ANSWER_LENGTH = 10
+
+# Результат для пустого или слишком короткого ответа
+_FALLBACK_TRIVIAL = AssessResult(
+    scores={
+        "theory": 20,
+        "practice": 20,
+        "interview_readiness": 20
+    },
+    weak_topics=["алгоритмы", "системный дизайн"],
+    follow_up="Расскажите подробнее: какие технологии вы используете и какие задачи решали?",
+    feedback=(
+        "Ответ слишком короткий, чтобы оценить уровень. "
+        "Опишите свой опыт развернуто — так оценка будет точнее."
+    ),
+    context_used=False
+)
+
+_TRIVIAL_FEEDBACK = {
+    "total_score": 0,
+    "criteria_scores": {"accuracy": 0, "completeness": 0, "clarity": 0, "examples": 0},
+    "strengths": [],
+    "improvements": ["Дайте развернутый ответ на вопрос"],
+    "recommended_resources": []
+}
+
+# Результат, если ответ модели не удалось разобрать (weak_topics заменяются темами запроса)
+_FALLBACK_PARSE_ERROR = AssessResult(
+    scores={
+        "theory": 60,
+        "practice": 60,
+        "interview_readiness": 60
+    },
+    weak_topics=["алгоритмы", "системный дизайн"],
+    follow_up="Расскажите, какие задачи вы уже решали на собеседованиях или в проектах?",
+    feedback=(
+        "Ответ выглядит в целом неплохо, чтобы начинать пробовать собеседования, "
+        "но для более точной оценки лучше пройти полноценный тест через команду /assess."
+    ),
+    context_used=False
+)
+
+# Результат при технической ошибке (не зависит от входных данных)
+_FALLBACK_GENERIC_ERROR = AssessResult(
+    scores={
+        "theory": 50,
+        "practice": 50,
+        "interview_readiness": 50
+    },
+    weak_topics=["технические вопросы", "алгоритмы"],
+    follow_up="Хочется ли вам сейчас получить подробный план подготовки или пройти мини‑тест?",
+    feedback=(
+        "Произошла техническая ошибка при анализе ответа. "
+        "Попробуйте ещё раз или воспользуйтесь командой /assess."
+    ),
+    context_used=False
+)
+
+
 # ===============================
 #  Основной класс агента с RAG
 # ===============================
 class AssessorAgent:
-    def __init__(self, use_rag: bool = True):
-        self.llm = GigaChat(
-            credentials=os.getenv("GIGACHAT_CLIENT_SECRET"),
-            verify_ssl_certs=False,
-            model="GigaChat"
-        )
-        self.use_rag = use_rag and RAG_AVAILABLE
-
-        # Сохраняем оригинальные промпты
-        self.prompt_without_rag = """
-        Ты — эксперт по техническим собеседованиям и оценке знаний.
-
-        Темы для оценки: {topics}
-
-        Ответ пользователя: {answer}
-
-        Всегда:
-        - давай явный вердикт по готовности к собеседованиям;
-        - объясняй, что означают выставленные баллы и какие темы проседают;
-        - предлагай конкретные следующие шаги.
-
-        Даже если запрос сформулирован общо, всё равно сделай разумное предположение и дай вердикт по готовности.
-
-        Верни строго JSON:
-        {{
-          "scores": {{
-            "theory": int,            # теоретическая база (0-100)
-            "practice": int,          # практический опыт (0-100)
-            "interview_readiness": int # готовность к собеседованию (0-100)
-          }},
-          "weak_topics": ["конкретные слабые темы"],
-          "follow_up": "уточняющий вопрос для следующего шага",
-          "feedback": "конструктивный разбор: что уже ок, что мешает собеседованиям и что делать дальше"
-        }}
+    prompt_without_rag = _PROMPT_WITHOUT_RAG
+    prompt_with_rag = _PROMPT_WITH_RAG
+
+    def __init__(self, use_rag: bool = True, use_cache: bool = True, use_draft: bool = False):
+        self.use_rag = use_rag
+        self.use_draft = use_draft and DRAFT_AVAILABLE
+
+        # Повторно присланный тот же ответ на тот же вопрос получает уже посчитанную оценку
+        # без RAG и LLM. Кэш точный: похожий ответ — это другой ответ и другая оценка
+        self._result_cache = ResultCache() if use_cache else None
+
+    @cached_property
+    def llm(self):
+        """Общий клиент GigaChat: создается при первом запросе, а не при импорте/создании агента"""
+        return get_gigachat("GigaChat")
+
+    @cached_property
+    def _retriever(self):
         """
+        Модуль rag.retriever, импортируется при первом поиске.
 
-        self.prompt_with_rag = """
-        Ты — эксперт по техническим собеседованиям. Используй информацию из базы знаний, но не цитируй её дословно.
-
-        КОНТЕКСТ ПОЛЬЗОВАТЕЛЯ:
-        - Уровень: {level}
-        - Направление: {track}
-        - Текущий вопрос: {question}
-
-        КОНТЕКСТ ИЗ БАЗЫ ЗНАНИЙ (примеры вопросов и тем):
-        {rag_context}
-
-        Темы для оценки: {topics}
-
-        Ответ пользователя: {answer}
-
-        Всегда:
-        - давай явный вердикт по готовности к собеседованиям;
-        - используй контекст только как подсказку, но отвечай применительно к пользователю;
-        - объясняй, что означают выставленные баллы и какие темы проседают;
-        - предлагай конкретные следующие шаги.
-
-        Верни строго JSON:
-        {{
-          "scores": {{
-            "theory": int,            # теоретическая база (0-100)
-            "practice": int,          # практический опыт (0-100)
-            "interview_readiness": int # готовность к собеседованию (0-100)
-          }},
-          "weak_topics": ["конкретные слабые темы"],
-          "follow_up": "уточняющий вопрос для следующего шага",
-          "feedback": "конструктивный разбор: что уже ок, что мешает собеседованиям и что делать дальше"
-        }}
+        Импорт тянет chromadb, поэтому не выполняется при загрузке модуля
+        и вовсе не нужен агентам с use_rag=False. None — если RAG недоступен.
         """
+        if not self.use_rag:
+            return None
+
+        try:
+            from rag import retriever
+        except ImportError:
+            logger.warning("RAG модуль не найден. Assessor будет работать без базы знаний.")
+            self.use_rag = False
+            return None
+
+        return retriever
+
+    @cached_property
+    def _draft(self):
+        """
+        Черновой оценщик, обученный офлайн на парах (ответ, оценка GigaChat).
+
+        Ожидается объект с методом predict(answer, topics) -> (scores, confidence).
+        Включается только явно: use_draft=True и путь в ASSESSOR_DRAFT_SCORER.
+        Файл загружается через pickle, поэтому указывать можно только доверенную модель.
+        Без него оценка всегда идет через LLM.
+        """
+        if not self.use_draft:
+            return None
+
+        if not _DRAFT_SCORER_PATH:
+            logger.warning("use_draft=True, но ASSESSOR_DRAFT_SCORER не задан — черновой оценщик выключен")
+            return None
+
+        try:
+            return joblib.load(_DRAFT_SCORER_PATH)
+        except Exception as e:
+            logger.warning("Не удалось загрузить черновой оценщик %s: %s", _DRAFT_SCORER_PATH, e)
+            return None
+
+    def _draft_result(self, answer: str, topics: list) -> Optional[AssessResult]:
+        """Оценка черновым оценщиком без RAG и LLM — только если он уверен в ней"""
+        if self._draft is None:
+            return None
+
+        try:
+            scores, confidence = self._draft.predict(answer, topics)
+        except Exception as e:
+            logger.warning("Ошибка чернового оценщика: %s", e)
+            return None
+
+        if confidence < _DRAFT_CONFIDENCE:
+            return None
+
+        scores = {name: int(value) for name, value in scores.items()}
+        return AssessResult(
+            scores=scores,
+            weak_topics=topics[:2] if min(scores.values(), default=100) < 60 else [],
+            follow_up="Хочется ли вам сейчас получить подробный план подготовки или пройти мини‑тест?",
+            context_used=False
+        )
+
+
+    def _format_rag_context(self, context_chunks: List[str]) -> Dict[str, str]:
+        """Собирает найденные фрагменты в контекст для промпта"""
+        # Извлекаем темы из контекста для примера
+        example_topics = {
+            _EXAMPLE_TOPICS[match.group().lower()]
+            for chunk in context_chunks[:2]
+            for match in _EXAMPLE_TOPICS_RE.finditer(chunk)
+        }
+
+        return {
+            "context": "\n".join(f"- {chunk[:300]}..." for chunk in context_chunks),
+            "example_topics": ", ".join(example_topics) if example_topics else "нет примеров"
+        }
+
+    def _rag_queries(self, topics: List[str], answer: str) -> Tuple[List[str], List[int]]:
+        """Запросы к базе знаний и число результатов для каждого"""
+        # Поиск по темам
+        queries = [f"{' '.join(topics)} техническое собеседование оценка ответов"]
+        ks = [3]
+
+        # Поиск по ответу пользователя
+        if answer and len(answer) > 10:
+            queries.append(f"ответ на вопрос о {topics[0] if topics else 'программировании'}")
+            ks.append(1)
+
+        return queries, ks
 
     def _get_rag_context(self, topics: List[str], answer: str) -> Dict[str, str]:
         """Получает контекст из RAG базы знаний (оригинальная функция)"""
-        if not self.use_rag:
+        if self._retriever is None:
             return {"context": "", "example_topics": ""}
 
         try:
-            # Поиск по темам
-            query = f"{' '.join(topics)} техническое собеседование оценка ответов"
-            context_chunks = retrieve_context(query, k=3)
-
-            # Поиск по ответу пользователя
-            if answer and len(answer) > 10:
-                answer_query = f"ответ на вопрос о {topics[0] if topics else 'программировании'}"
-                answer_context = retrieve_context(answer_query, k=1)
-                context_chunks.extend(answer_context)
-
-            # Извлекаем темы из контекста для примера
-            example_topics = []
-            if context_chunks:
-                for chunk in context_chunks[:2]:
-                    if "Python" in chunk:
-                        example_topics.append("Python")
-                    if "алгоритм" in chunk.lower():
-                        example_topics.append("Алгоритмы")
-                    if "база данных" in chunk.lower():
-                        example_topics.append("Базы данных")
-
-            return {
-                "context": "\n".join([f"- {chunk[:300]}..." for chunk in context_chunks]),
-                "example_topics": ", ".join(set(example_topics)) if example_topics else "нет примеров"
-            }
+            # Оба запроса — одним батчем эмбеддингов и одним обращением к хранилищу
+            results = self._retriever.retrieve_context_batch(*self._rag_queries(topics, answer))
+            context_chunks = [chunk for chunks in results for chunk in chunks]
+
+            return self._format_rag_context(context_chunks)
 
         except Exception as e:
-            print(f"⚠️  Ошибка RAG в Assessor: {e}")
+            logger.warning("Ошибка RAG в Assessor: %s", e, exc_info=True)
             return {"context": "", "example_topics": ""}
 
-    def assess(self, answer: str, topics: list, user_context: dict = None) -> AssessResult:
-        """Оценивает ответ пользователя с использованием RAG (улучшенная)"""
+    async def _aget_rag_context(self, topics: List[str], answer: str) -> Dict[str, str]:
+        """Асинхронная версия _get_rag_context: поиск выполняется вне event loop"""
+        if self._retriever is None:
+            return {"context": "", "example_topics": ""}
 
-        # Устанавливаем контекст по умолчанию
-        if user_context is None:
-            user_context = {}
+        try:
+            results = await asyncio.to_thread(self._retriever.retrieve_context_batch, *self._rag_queries(topics, answer))
+            context_chunks = [chunk for chunks in results for chunk in chunks]
+
+            return self._format_rag_context(context_chunks)
 
+        except Exception as e:
+            logger.warning("Ошибка RAG в Assessor: %s", e, exc_info=True)
+            return {"context": "", "example_topics": ""}
+
+    def _build_assess_prompt(self, answer: str, topics: list, user_context: dict,
+                             rag_context: Dict[str, str]) -> Tuple[str, bool]:
+        """Выбирает промпт в зависимости от наличия RAG и подставляет данные"""
         level = user_context.get('level', 'junior')
         track = user_context.get('track', 'general')
         question = user_context.get('current_question', 'Общие знания')
 
-        # Получаем контекст из RAG
-        rag_context = self._get_rag_context(topics, answer)
-
-        # Выбираем промпт в зависимости от наличия RAG
         if self.use_rag and rag_context["context"]:
-            text = self.prompt_with_rag.format(
+            text = _fmt_with_rag(
                 level=level,
                 track=track,
                 question=question,
@@ -173,159 +376,247 @@ class AssessorAgent:
                 topics=topics,
                 answer=answer
             )
-            context_used = True
-        else:
-            text = self.prompt_without_rag.format(
-                topics=topics,
-                answer=answer
-            )
-            context_used = False
+            return text, True
 
-        # Отправляем в GigaChat
+        text = _fmt_without_rag(
+            topics=topics,
+            answer=answer
+        )
+        return text, False
+
+    def _extract_json(self, content: str) -> dict:
+        """Достает JSON из ответа модели: снимает ```-обертку и пропускает текст вокруг объекта"""
+        # Объект ищем после открывающей ```-обертки (```json или просто ```), если она есть.
+        # Только поиск по индексам: строка копируется один раз — при срезе для парсера
+        fence = content.find("```")
+        start = content.find("{", fence + 3) if fence != -1 else -1
+        if start == -1:
+            start = content.find("{")
+        if start == -1:
+            raise ValueError(f"В ответе нет JSON: {content[:200]}")
+
+        # Разбираем строго до последней "}": текст и обертка после объекта отрезаются,
+        # а оборванный ответ — ошибка, а не оценка с полями по умолчанию
+        end = content.rfind("}")
+        if end < start:
+            raise ValueError(f"JSON в ответе оборван: {content[:200]}")
+        return from_json(content[start:end + 1])
+
+    def _parse_assess_response(self, content: str, context_used: bool) -> Optional[AssessResult]:
+        """Разбирает ответ модели в AssessResult, None — если JSON извлечь не удалось"""
         try:
-            response = self.llm.chat(text)
+            data = self._extract_json(content)
+        except ValueError as e:
+            logger.warning("Ошибка парсинга JSON: %s", e)
+            return None
+
+        return _ASSESS_ADAPTER.validate_python({
+            "scores": {},
+            "weak_topics": [],
+            "follow_up": "",
+            "feedback": "",
+            **data,
+            "context_used": context_used
+        })
+
+    def _parse_fallback_result(self, topics: list, context_used: bool) -> AssessResult:
+        """Результат по умолчанию, если ответ модели не удалось разобрать"""
+        update = {"context_used": context_used}
+        if topics:
+            update["weak_topics"] = topics[:2]
+        return _FALLBACK_PARSE_ERROR.model_copy(update=update)
+
+    def _trivial_result(self, topics: list) -> AssessResult:
+        """Результат для пустого или слишком короткого ответа"""
+        if topics:
+            return _FALLBACK_TRIVIAL.model_copy(update={"weak_topics": topics[:2]})
+        return _FALLBACK_TRIVIAL
+
+    def _assess_error_result(self, e: Exception) -> AssessResult:
+        """Результат по умолчанию при технической ошибке"""
+        logger.exception("Ошибка в assess: %s", e)
+        return _FALLBACK_GENERIC_ERROR
+
+    def _prompt_cache_id(self, user_context: dict) -> Optional[str]:
+        """X-Session-ID для кэша начала промпта в GigaChat: свой у каждого пользователя"""
+        user_id = user_context.get('user_id')
+        return f"interprep-assessor-{user_id}" if user_id else None
+
+    def _cache_key(self, answer: str, topics: list, user_context: dict) -> Tuple[str, ...]:
+        """Ключ кэша: все, что попадает в промпт, — вопрос, уровень, направление, темы и ответ"""
+        return (
+            user_context.get('current_question', 'Общие знания'),
+            user_context.get('level', 'junior'),
+            user_context.get('track', 'general'),
+            ",".join(topics),
+            answer
+        )
 
-            content = response.choices[0].message.content
+    def _finish_assess(self, content: str, topics: list, context_used: bool,
+                       cache_key: Tuple[str, ...]) -> AssessResult:
+        """Разбирает ответ модели и сохраняет удачную оценку в кэш"""
+        result = self._parse_assess_response(content, context_used)
+        if result is None:
+            return self._parse_fallback_result(topics, context_used)
 
-            # Чистим JSON от возможных меток кода
-            if "```json" in content:
-                content = content.split("```json")[1].split("```")[0].strip()
-            elif "```" in content:
-                content = content.strip("`").strip()
+        if self._result_cache is not None:
+            self._result_cache.put(cache_key, result)
+        return result
 
-            data = json.loads(content)
+    def assess(self, answer: str, topics: list, user_context: dict = None) -> AssessResult:
+        """Оценивает ответ пользователя с использованием RAG (улучшенная)"""
 
-            return AssessResult(
-                scores=data.get("scores", {}),
-                weak_topics=data.get("weak_topics", []),
-                follow_up=data.get("follow_up", ""),
-                feedback=data.get("feedback", ""),
-                context_used=context_used
-            )
+        # Пустой или односложный ответ оценивать нечего — не тратим RAG и LLM
+        if len(answer.strip()) < _MIN_ANSWER_LENGTH:
+            return self._trivial_result(topics)
 
-        except json.JSONDecodeError as e:
-            print(f"❌ Ошибка парсинга JSON: {e}")
-            print(f"Ответ модели: {content[:200] if 'content' in locals() else 'Нет ответа'}...")
-
-            import re
-            json_match = re.search(r'\{.*\}', content, re.DOTALL) if 'content' in locals() else None
-
-            if json_match:
-                try:
-                    data = json.loads(json_match.group())
-                    return AssessResult(
-                        scores=data.get("scores", {}),
-                        weak_topics=data.get("weak_topics", []),
-                        follow_up=data.get("follow_up", ""),
-                        feedback=data.get("feedback", ""),
-                        context_used=context_used
-                    )
-                except Exception as inner_e:
-                    print(f"⚠️ Повторная ошибка парсинга JSON: {inner_e}")
-
-            # Fallback
-            return AssessResult(
-                scores={
-                    "theory": 60,
-                    "practice": 60,
-                    "interview_readiness": 60
-                },
-                weak_topics=topics[:2] if topics else ["алгоритмы", "системный дизайн"],
-                follow_up="Расскажите, какие задачи вы уже решали на собеседованиях или в проектах?",
-                feedback=(
-                    "Ответ выглядит в целом неплохо, чтобы начинать пробовать собеседования, "
-                    "но для более точной оценки лучше пройти полноценный тест через команду /assess."
-                ),
-                context_used=context_used
-            )
+        # Устанавливаем контекст по умолчанию
+        if user_context is None:
+            user_context = {}
+
+        cache_key = self._cache_key(answer, topics, user_context)
+        if self._result_cache is not None:
+            cached = self._result_cache.get(cache_key)
+            if cached is not None:
+                return cached
+
+        # Очевидно сильные/слабые ответы оцениваются локально, без запроса к GigaChat
+        draft = self._draft_result(answer, topics)
+        if draft is not None:
+            return draft
+
+        # Получаем контекст из RAG
+        rag_context = self._get_rag_context(topics, answer)
+        text, context_used = self._build_assess_prompt(answer, topics, user_context, rag_context)
 
+        # Отправляем в GigaChat
+        try:
+            with prompt_cache_session(self._prompt_cache_id(user_context)):
+                response = self.llm.chat(text)
+            return self._finish_assess(response.choices[0].message.content, topics, context_used, cache_key)
         except Exception as e:
-            print(f"❌ Ошибка в assess: {e}")
-            return AssessResult(
-                scores={
-                    "theory": 50,
-                    "practice": 50,
-                    "interview_readiness": 50
-                },
-                weak_topics=["технические вопросы", "алгоритмы"],
-                follow_up="Хочется ли вам сейчас получить подробный план подготовки или пройти мини‑тест?",
-                feedback=(
-                    "Произошла техническая ошибка при анализе ответа. "
-                    "Попробуйте ещё раз или воспользуйтесь командой /assess."
-                ),
-                context_used=False
+            return self._assess_error_result(e)
+
+    async def aassess(self, answer: str, topics: list, user_context: dict = None) -> AssessResult:
+        """Асинхронная версия assess: не блокирует event loop на время RAG и запроса к GigaChat.
+
+        Несколько оценок можно выполнять одновременно:
+        await asyncio.gather(*[agent.aassess(a, t) for a, t in batch])
+        """
+        if len(answer.strip()) < _MIN_ANSWER_LENGTH:
+            return self._trivial_result(topics)
+
+        if user_context is None:
+            user_context = {}
+
+        cache_key = self._cache_key(answer, topics, user_context)
+        if self._result_cache is not None:
+            cached = self._result_cache.get(cache_key)
+            if cached is not None:
+                return cached
+
+        draft = self._draft_result(answer, topics)
+        if draft is not None:
+            return draft
+
+        rag_context = await self._aget_rag_context(topics, answer)
+        text, context_used = self._build_assess_prompt(answer, topics, user_context, rag_context)
+
+        try:
+            with prompt_cache_session(self._prompt_cache_id(user_context)):
+                response = await self.llm.achat(text)
+            result = await asyncio.to_thread(
+                self._finish_assess, response.choices[0].message.content, topics, context_used, cache_key
             )
+            return result
+        except Exception as e:
+            return self._assess_error_result(e)
+
+    def _build_feedback_prompt(self, question: str, user_answer: str, correct_answer: Optional[str],
+                               user_context: dict, context: str) -> str:
+        """Собирает промпт для расширенной оценки"""
+        level = user_context.get('level', 'junior')
+        track = user_context.get('track', 'general')
+
+        return _fmt_feedback(
+            level=level,
+            track=track,
+            question=question,
+            user_answer=user_answer,
+            correct_answer_line=f"Правильный ответ (справочно): {correct_answer}" if correct_answer else "",
+            context_line=f"Дополнительный контекст: {context}" if context else ""
+        )
+
+    def _parse_feedback_response(self, content: str) -> Dict:
+        """Разбирает JSON-ответ расширенной оценки"""
+        return self._extract_json(content)
+
+    def _feedback_error_result(self, e: Exception) -> Dict:
+        """Результат по умолчанию для assess_with_feedback"""
+        logger.exception("Ошибка в assess_with_feedback: %s", e)
+        return {
+            "total_score": 50,
+            "criteria_scores": {"accuracy": 20, "completeness": 15, "clarity": 10, "examples": 5},
+            "strengths": ["Базовое понимание темы"],
+            "improvements": ["Нужно больше деталей и примеров"],
+            "recommended_resources": ["Документация, LeetCode, YouTube уроки"]
+        }
 
     def assess_with_feedback(self, question: str, user_answer: str,
                              correct_answer: str = None, user_context: dict = None) -> Dict:
         """Расширенная оценка с учетом правильного ответа (улучшенная)"""
 
+        if not user_answer.strip():
+            return dict(_TRIVIAL_FEEDBACK)
+
         if user_context is None:
             user_context = {}
 
-        level = user_context.get('level', 'junior')
-        track = user_context.get('track', 'general')
-
         # Ищем контекст по вопросу
         context = ""
-        if self.use_rag:
+        if self._retriever is not None:
             try:
-                context_chunks = retrieve_context(question, k=2)
+                context_chunks = self._retriever.retrieve_context(question, k=2)
                 if context_chunks:
                     context = "\n".join(context_chunks)
             except Exception as e:
-                print(f"⚠️  Ошибка RAG в assess_with_feedback: {e}")
+                logger.warning("Ошибка RAG в assess_with_feedback: %s", e, exc_info=True)
 
-        prompt = f"""
-Оцени ответ на технический вопрос.
+        prompt = self._build_feedback_prompt(question, user_answer, correct_answer, user_context, context)
 
-КОНТЕКСТ:
-- Уровень: {level}
-- Направление: {track}
+        try:
+            response = self.llm.chat(prompt)
+            return self._parse_feedback_response(response.choices[0].message.content)
+        except Exception as e:
+            return self._feedback_error_result(e)
 
-Вопрос: {question}
-Ответ пользователя: {user_answer}
-{f'Правильный ответ (справочно): {correct_answer}' if correct_answer else ''}
-{f'Дополнительный контекст: {context}' if context else ''}
+    async def aassess_with_feedback(self, question: str, user_answer: str,
+                                    correct_answer: str = None, user_context: dict = None) -> Dict:
+        """Асинхронная версия assess_with_feedback"""
 
-Проанализируй ответ по критериям:
-1. Техническая точность (0-40)
-2. Полнота ответа (0-30)  
-3. Структура и ясность (0-20)
-4. Примеры и детали (0-10)
+        if not user_answer.strip():
+            return dict(_TRIVIAL_FEEDBACK)
 
-Верни строго JSON:
-{{
-    "total_score": 0-100,
-    "criteria_scores": {{
-        "accuracy": 0-40,
-        "completeness": 0-30,
-        "clarity": 0-20,
-        "examples": 0-10
-    }},
-    "strengths": ["сильные стороны"],
-    "improvements": ["что улучшить"],
-    "recommended_resources": ["ресурсы для изучения"]
-}}
-"""
+        if user_context is None:
+            user_context = {}
 
-        try:
-            response = self.llm.chat(prompt)
-            content = response.choices[0].message.content
+        context = ""
+        if self._retriever is not None:
+            try:
+                context_chunks = await asyncio.to_thread(self._retriever.retrieve_context, question, k=2)
+                if context_chunks:
+                    context = "\n".join(context_chunks)
+            except Exception as e:
+                logger.warning("Ошибка RAG в assess_with_feedback: %s", e, exc_info=True)
 
-            # Очистка JSON
-            if "```json" in content:
-                content = content.split("```json")[1].split("```")[0].strip()
-            elif "```" in content:
-                content = content.strip("`").strip()
+        prompt = self._build_feedback_prompt(question, user_answer, correct_answer, user_context, context)
 
-            return json.loads(content)
+        try:
+            content = await astream_until_json(self.llm, prompt)
+            return self._parse_feedback_response(content)
         except Exception as e:
-            print(f"❌ Ошибка в assess_with_feedback: {e}")
-            return {
-                "total_score": 50,
-                "criteria_scores": {"accuracy": 20, "completeness": 15, "clarity": 10, "examples": 5},
-                "strengths": ["Базовое понимание темы"],
-                "improvements": ["Нужно больше деталей и примеров"],
-                "recommended_resources": ["Документация, LeetCode, YouTube уроки"]
-            }
\ No newline at end of file
+            return self._feedback_error_result(e)
+
+
+# Общий экземпляр для обработчиков бота: один кэш оценок и один клиент GigaChat на процесс
+assessor = AssessorAgent()
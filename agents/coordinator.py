@@ -1,13 +1,17 @@
 # agents/coordinator.py
 import json
+import logging
 import sys
+from dataclasses import dataclass
+from functools import cached_property
 from pathlib import Path
-from pydantic import BaseModel
-from gigachat import GigaChat
-from dotenv import load_dotenv
 import os
 from typing import Dict, Any, Optional
 
+from agents._llm import get_gigachat
+
+logger = logging.getLogger(__name__)
+
 # Добавляем путь для импорта
 sys.path.append(str(Path(__file__).resolve().parent.parent))
 
@@ -17,17 +21,36 @@ try:
 
     RAG_AVAILABLE = True
 except ImportError:
-    print("⚠️  RAG модуль не найден. Coordinator будет работать без базы знаний.")
+    logger.warning("RAG модуль не найден. Coordinator будет работать без базы знаний.")
     RAG_AVAILABLE = False
 
 
     def retrieve_context(query: str, k: int = 4) -> list:
         return []
 
-load_dotenv()
-
-
-class RouteResult(BaseModel):
+# Ключевые слова для маршрутизации: собираются один раз при импорте, а не на каждый запрос
+# Явные признаки описания навыков
+_SKILL_INDICATORS = (
+    'знаю', 'опыт', 'работал', 'владею', 'умею',
+    'python', 'django', 'java', 'javascript',
+    'год', 'лет', 'месяц', 'проект'
+)
+# План обучения
+_PLAN_KEYWORDS = ('хочу изучать', 'научиться', 'освоить', 'изуч', 'обуч', 'планир')
+# Собеседование
+_INTERVIEW_KEYWORDS = ('собеседован', 'интервью', 'вопросы', 'mock')
+# Code review
+_CODE_KEYWORDS = ('код', 'решен', 'задач', 'алгоритм')
+
+
+@dataclass(slots=True, frozen=True)
+class RouteResult:
+    """
+    Результат маршрутизации.
+
+    Обычный dataclass со __slots__: route() заполняет поля сам, валидация
+    не нужна, а экземпляры без __dict__ меньше и быстрее в доступе к полям.
+    """
     agent: str
     context: str
     metadata: dict
@@ -36,21 +59,56 @@ class RouteResult(BaseModel):
     rag_context_used: Optional[bool] = False
 
 
+# Результаты маршрутов, не зависящих от текста запроса: создаются один раз
+# и отдаются всем вызывающим (обработчики только читают поля)
+_PLANNER_RESULT = RouteResult(
+    agent="PLANNER",
+    context="Пользователь хочет создать план обучения",
+    metadata={"intent": "learning_plan"},
+    confidence=0.8,
+    rag_context_used=False
+)
+
+_INTERVIEWER_RESULT = RouteResult(
+    agent="INTERVIEWER",
+    context="Запрос на собеседование",
+    metadata={"intent": "interview"},
+    confidence=0.8,
+    rag_context_used=False
+)
+
+_REVIEWER_RESULT = RouteResult(
+    agent="REVIEWER",
+    context="Запрос на разбор кода",
+    metadata={"intent": "code_review"},
+    confidence=0.8,
+    rag_context_used=False
+)
+
+_HELPER_RESULT = RouteResult(
+    agent="HELPER",
+    context="Не удалось определить конкретный запрос",
+    metadata={"fallback": True, "text_analysis": "no_clear_intent"},
+    confidence=0.3,
+    rag_context_used=False
+)
+
+
 class CoordinatorAgent:
     def __init__(self, use_rag: bool = True):
-        load_dotenv()
+        # .env уже загружен при импорте модуля
         self.client_secret = os.getenv("GIGACHAT_CLIENT_SECRET")
         if not self.client_secret:
             raise ValueError("❌ Не найден GIGACHAT_CLIENT_SECRET в .env")
 
-        self.llm = GigaChat(
-            credentials=self.client_secret,
-            verify_ssl_certs=False,
-            model="GigaChat"
-        )
         self.use_rag = use_rag and RAG_AVAILABLE
         self.user_states = {}  # user_id -> state
 
+    @cached_property
+    def llm(self):
+        """Общий для процесса клиент GigaChat, создается при первом обращении"""
+        return get_gigachat("GigaChat")
+
     def route(self, user_text: str, user_context: dict = None, user_id: str = None) -> RouteResult:
         """Основной метод маршрутизации"""
 
@@ -60,7 +118,8 @@ class CoordinatorAgent:
         state = self.user_states.get(user_id, {})
         current_mode = state.get('mode')
 
-        print(f"🔍 Coordinator: '{user_text[:50]}...', mode={current_mode}, user_id={user_id}")
+        if logger.isEnabledFor(logging.DEBUG):
+            logger.debug("Coordinator: '%s...', mode=%s, user_id=%s", user_text[:50], current_mode, user_id)
 
         # 1. Проверяем если это прямое описание навыков после /assess
         if current_mode == 'awaiting_assessment_details':
@@ -85,14 +144,7 @@ class CoordinatorAgent:
         # 2. Проверяем если это описание навыков (даже без состояния)
         text_lower = user_text.lower()
 
-        # Явные признаки описания навыков
-        skill_indicators = [
-            'знаю', 'опыт', 'работал', 'владею', 'умею',
-            'python', 'django', 'java', 'javascript',
-            'год', 'лет', 'месяц', 'проект'
-        ]
-
-        skill_count = sum(1 for indicator in skill_indicators if indicator in text_lower)
+        skill_count = sum(1 for indicator in _SKILL_INDICATORS if indicator in text_lower)
         has_comma = ',' in user_text
         word_count = len(user_text.split())
 
@@ -119,49 +171,22 @@ class CoordinatorAgent:
 
         # 3. Проверяем другие типы запросов
         # План обучения
-        plan_keywords = ['хочу изучать', 'научиться', 'освоить', 'изуч', 'обуч', 'планир']
-        if any(keyword in text_lower for keyword in plan_keywords):
+        if any(keyword in text_lower for keyword in _PLAN_KEYWORDS):
             if user_id:
                 self.user_states[user_id] = {'mode': 'planning'}
 
-            return RouteResult(
-                agent="PLANNER",
-                context=f"Пользователь хочет создать план обучения",
-                metadata={"intent": "learning_plan"},
-                confidence=0.8,
-                rag_context_used=False
-            )
+            return _PLANNER_RESULT
 
         # Собеседование
-        interview_keywords = ['собеседован', 'интервью', 'вопросы', 'mock']
-        if any(keyword in text_lower for keyword in interview_keywords):
-            return RouteResult(
-                agent="INTERVIEWER",
-                context=f"Запрос на собеседование",
-                metadata={"intent": "interview"},
-                confidence=0.8,
-                rag_context_used=False
-            )
+        if any(keyword in text_lower for keyword in _INTERVIEW_KEYWORDS):
+            return _INTERVIEWER_RESULT
 
         # Code review
-        code_keywords = ['код', 'решен', 'задач', 'алгоритм']
-        if any(keyword in text_lower for keyword in code_keywords):
-            return RouteResult(
-                agent="REVIEWER",
-                context=f"Запрос на разбор кода",
-                metadata={"intent": "code_review"},
-                confidence=0.8,
-                rag_context_used=False
-            )
+        if any(keyword in text_lower for keyword in _CODE_KEYWORDS):
+            return _REVIEWER_RESULT
 
         # 4. Если ничего не подошло - общий помощник
-        return RouteResult(
-            agent="HELPER",
-            context="Не удалось определить конкретный запрос",
-            metadata={"fallback": True, "text_analysis": "no_clear_intent"},
-            confidence=0.3,
-            rag_context_used=False
-        )
+        return _HELPER_RESULT
 
     def set_user_state(self, user_id: str, mode: str, data: dict = None):
         """Устанавливает состояние пользователя"""
@@ -172,10 +197,10 @@ class CoordinatorAgent:
             'mode': mode,
             **data
         }
-        print(f"✅ Установлено состояние для {user_id}: {mode}")
+        logger.debug("Установлено состояние для %s: %s", user_id, mode)
 
     def clear_user_state(self, user_id: str):
         """Очищает состояние пользователя"""
         if user_id in self.user_states:
             del self.user_states[user_id]
-            print(f"✅ Очищено состояние для {user_id}")
\ No newline at end of file
+            logger.debug("Очищено состояние для %s", user_id)
\ No newline at end of file
@@ -1,16 +1,21 @@
 # agents/interviewer_agent.py
+import asyncio
+import functools
 import json
-import sys
-from pathlib import Path
-from pydantic import BaseModel
-from gigachat import GigaChat
-from dotenv import load_dotenv
-import os
-from typing import List, Optional, Dict, Any
+import re
+import time
+from contextlib import aclosing
+from dataclasses import dataclass, field
+from pydantic import BaseModel, ConfigDict, TypeAdapter
+from pydantic_core import from_json
+from typing import List, Optional, Dict, Any, AsyncIterator, Tuple
 from datetime import datetime
+from functools import cached_property
 
-# Загружаем токены
-load_dotenv()
+from agents._llm import astream_until_json, get_gigachat, stream_until_json
+from agents._result_cache import ResultCache
+from agents._session_store import SessionStore, default_session_store
+from agents._templates import compile_template
 
 # Импортируем RAG (с обработкой ошибок)
 try:
@@ -22,14 +27,239 @@ except ImportError:
     RAG_AVAILABLE = False
 
 
-    def retrieve_context(query: str, k: int = 4) -> List[str]:
+    def retrieve_context(query: str, k: int = 4, agent: Optional[str] = None,
+                         max_chars: Optional[int] = None) -> List[str]:
         return []
 
+# Быстрый парсер JSON (если установлен)
+try:
+    from orjson import loads as json_loads
+except ImportError:
+    json_loads = json.loads
+
+# Семантический кэш ответов LLM (нужен numpy)
+try:
+    from rag.semantic_cache import SemanticCache
+
+    CACHE_AVAILABLE = True
+except ImportError:
+    CACHE_AVAILABLE = False
+
+# JSON-список в ответе модели (компилируется один раз)
+_LIST_RE = re.compile(r'\[.*\]', re.DOTALL)
+
+# Оценка пустого ответа: он оценивается без запроса к LLM. Короткие ответы
+# («O(1)», «GIL») бывают верными, поэтому их по-прежнему оценивает модель.
+# Списки — кортежи: словарь общий для всех сессий, а InterviewScore получает свои копии
+_EMPTY_EVALUATION = {
+    "score": 0,
+    "comment": "Ответ пустой",
+    "strong_points": (),
+    "weak_points": ("Дайте ответ на вопрос",),
+    "recommended_resources": ()
+}
+
+# Подсказки, если сгенерировать их не удалось
+_DEFAULT_HINTS = ("Подумайте о ключевых концепциях", "Приведите практический пример")
+
+# Рекомендации, если сгенерировать их не удалось
+_DEFAULT_RECOMMENDATIONS = (
+    "Практиковаться на LeetCode/HackerRank",
+    "Изучать документацию и best practices",
+    "Проходить больше mock интервью"
+)
+
+
+# Промпты: статичный текст разбирается один раз при импорте, на вызове — только склейка строк
+_QUESTIONS_PROMPT_WITH_RAG = """
+Ты — опытный технический интервьюер. У тебя есть доступ к базе вопросов.
+
+КОНТЕКСТ ИЗ БАЗЫ ЗНАНИЙ:
+{rag_context}
+
+КОНТЕКСТ ПОЛЬЗОВАТЕЛЯ:
+- Уровень: {user_level}
+- Направление: {track}
+
+Сгенерируй 3 уникальных вопроса по теме: {topic}
+Вопросы должны соответствовать уровню {user_level}.
+
+Формат строго JSON:
+{{
+  "questions": [
+    {{
+      "topic": "конкретная подтема",
+      "question": "текст вопроса",
+      "expected_concepts": ["концепция1", "концепция2", "концепция3"],
+      "difficulty": "easy/medium/hard",
+      "hints": ["подсказка 1", "подсказка 2"]
+    }}
+  ]
+}}
+
+Создай 1 легкий, 1 средний и 1 сложный вопрос.
+"""
+
+_QUESTIONS_PROMPT_WITHOUT_RAG = """
+Ты — опытный технический интервьюер.
+
+КОНТЕКСТ ПОЛЬЗОВАТЕЛЯ:
+- Уровень: {user_level}
+- Направление: {track}
+
+Сгенерируй 3 вопроса по теме: {topic}
+Вопросы должны соответствовать уровню {user_level}.
+
+Формат строго JSON:
+{{
+  "questions": [
+    {{
+      "topic": "конкретная подтема",
+      "question": "текст вопроса",
+      "expected_concepts": ["концепция1", "концепция2"],
+      "difficulty": "easy/medium/hard",
+      "hints": ["подсказка 1", "подсказка 2"]
+    }}
+  ]
+}}
+"""
+
+_EVALUATION_PROMPT_WITH_RAG = """
+Ты — технический интервьюер.
+
+КОНТЕКСТ ПОЛЬЗОВАТЕЛЯ:
+- Уровень: {user_level}
+
+ИНФОРМАЦИЯ ДЛЯ ОЦЕНКИ:
+{rag_context}
+
+ВОПРОС: {question}
+ОЖИДАЕМЫЕ КОНЦЕПЦИИ: {concepts}
+
+ОТВЕТ КАНДИДАТА: {answer}
+
+Оцени ответ кандидата уровня {user_level} по шкале 0-100.
+Учти, что для уровня {user_level} требования соответствующие.
+
+Формат строго JSON:
+{{
+  "score": число от 0 до 100,
+  "comment": "детальный фидбек, что правильно, что можно улучшить",
+  "strong_points": ["сильные стороны ответа"],
+  "weak_points": ["что нужно улучшить"],
+  "recommended_resources": ["рекомендации по изучению"]
+}}
+"""
+
+_EVALUATION_PROMPT_WITHOUT_RAG = """
+Ты — технический интервьюер.
+
+КОНТЕКСТ:
+- Уровень кандидата: {user_level}
+
+ВОПРОС: {question}
+ОЖИДАЕМЫЕ КОНЦЕПЦИИ: {concepts}
+
+ОТВЕТ КАНДИДАТА: {answer}
+
+Оцени ответ кандидата уровня {user_level} по шкале 0-100.
+
+Формат строго JSON:
+{{
+  "score": число от 0 до 100,
+  "comment": "конструктивный фидбек",
+  "strong_points": ["что хорошо в ответе"],
+  "weak_points": ["что нужно доработать"]
+}}
+"""
+
+_HINTS_PROMPT = """
+Вопрос для интервью: {question}
+Тема: {topic}
+Уровень кандидата: {level}
+
+Дай 2 подсказки, которые помогут кандидату уровня {level} ответить на вопрос.
+Подсказки должны быть конкретными и полезными.
+
+Формат: ["подсказка 1", "подсказка 2"]
+"""
+
+_RECOMMENDATIONS_PROMPT = """
+На основе слабых сторон: {weak_points}
+Дай 3 конкретные рекомендации для улучшения.
+
+Формат: ["рекомендация 1", "рекомендация 2", "рекомендация 3"]
+"""
+
+_fmt_questions_with_rag = compile_template(_QUESTIONS_PROMPT_WITH_RAG)
+_fmt_questions_without_rag = compile_template(_QUESTIONS_PROMPT_WITHOUT_RAG)
+_fmt_evaluation_with_rag = compile_template(_EVALUATION_PROMPT_WITH_RAG)
+_fmt_evaluation_without_rag = compile_template(_EVALUATION_PROMPT_WITHOUT_RAG)
+_fmt_hints = compile_template(_HINTS_PROMPT)
+_fmt_recommendations = compile_template(_RECOMMENDATIONS_PROMPT)
+
+# Метка на месте переменной части промпта; по ней готовый текст режется на (начало, конец)
+_SLOT = "\0slot\0"
+
+
+@functools.lru_cache(maxsize=64)
+def _questions_prompt_parts(user_level: str, track: str, topic: str) -> Tuple[str, str]:
+    """Промпт генерации вопросов с RAG, уже заполненный всем, кроме контекста"""
+    prefix, _, suffix = _fmt_questions_with_rag(
+        rag_context=_SLOT,
+        user_level=user_level,
+        track=track,
+        topic=topic
+    ).partition(_SLOT)
+    return prefix, suffix
+
+
+@functools.lru_cache(maxsize=64)
+def _questions_prompt_without_rag(user_level: str, track: str, topic: str) -> str:
+    return _fmt_questions_without_rag(user_level=user_level, track=track, topic=topic)
+
+
+@functools.lru_cache(maxsize=256)
+def _evaluation_prompt_parts(user_level: str, rag_context: str, question: str, concepts: str) -> Tuple[str, str]:
+    """Промпт оценки, заполненный всем, кроме ответа: для вопроса он один на всю сессию"""
+    if rag_context:
+        prompt = _fmt_evaluation_with_rag(
+            user_level=user_level,
+            rag_context=rag_context,
+            question=question,
+            concepts=concepts,
+            answer=_SLOT
+        )
+    else:
+        prompt = _fmt_evaluation_without_rag(
+            user_level=user_level,
+            question=question,
+            concepts=concepts,
+            answer=_SLOT
+        )
+    # Ответ стоит после вопроса и контекста, поэтому режем по последней метке
+    prefix, _, suffix = prompt.rpartition(_SLOT)
+    return prefix, suffix
+
+
+def _top_k_unique(groups, k: int = 5) -> list:
+    """Первые k уникальных элементов из последовательности списков (None пропускаются)"""
+    seen = {}
+    for group in groups:
+        for item in group or ():
+            if item not in seen:
+                seen[item] = None
+                if len(seen) >= k:
+                    return list(seen)
+    return list(seen)
+
 
 # ===============================
 #  Модели данных
 # ===============================
 class InterviewQuestion(BaseModel):
+    model_config = ConfigDict(frozen=True)
+
     topic: str
     question: str
     expected_concepts: list
@@ -40,6 +270,8 @@ class InterviewQuestion(BaseModel):
 
 
 class InterviewScore(BaseModel):
+    model_config = ConfigDict(frozen=True)
+
     score: int
     comment: str
     strong_points: Optional[List[str]] = None
@@ -47,30 +279,130 @@ class InterviewScore(BaseModel):
     recommended_resources: Optional[List[str]] = None
 
 
-class InterviewSession(BaseModel):
+# Вопросы из ответа модели валидируются списком целиком, в pydantic-core
+_QUESTIONS_ADAPTER = TypeAdapter(List[InterviewQuestion])
+
+
+@dataclass(slots=True, kw_only=True)
+class InterviewSession:
+    """
+    Внутреннее состояние интервью — обычный dataclass со слотами, без валидации pydantic.
+
+    Вопросы и оценки остаются моделями pydantic; в JSON для хранилища сессий
+    весь объект сериализуется через TypeAdapter.
+    """
     id: str
     topic: str
     level: str
     questions: List[InterviewQuestion]
     current_question_index: int = 0
-    scores: List[InterviewScore] = []
+    scores: List[InterviewScore] = field(default_factory=list)
     started_at: str
     user_context: Optional[Dict] = None  # ← ДОБАВИЛ: контекст пользователя
 
 
+@functools.lru_cache(maxsize=128)
+def _fallback_template(topic: str) -> Tuple[InterviewQuestion, ...]:
+    """Вопросы по умолчанию для темы; собираются один раз на тему"""
+    return (
+        InterviewQuestion(
+            topic=topic,
+            question=f"Что вы знаете о {topic}?",
+            expected_concepts=[topic, "базовые принципы"],
+            difficulty="easy",
+            rag_context_used=False
+        ),
+        InterviewQuestion(
+            topic=topic,
+            question=f"Приведите пример использования {topic}",
+            expected_concepts=["практическое применение"],
+            difficulty="medium",
+            rag_context_used=False
+        ),
+        InterviewQuestion(
+            topic=topic,
+            question=f"Какие проблемы могут возникнуть при работе с {topic} и как их решить?",
+            expected_concepts=["проблемы", "решения"],
+            difficulty="hard",
+            rag_context_used=False
+        )
+    )
+
+
+@functools.lru_cache(maxsize=1024)
+def _retrieve_chunks(query: str, k: int, max_chars: int) -> Tuple[str, ...]:
+    """retrieve_context с кэшем на процесс; пустой результат (в т.ч. ошибка поиска) не кэшируется"""
+    # Ищем только среди документов интервьюера (вопросы с ответами), а не по всей базе
+    chunks = retrieve_context(query, k=k, agent="interviewer", max_chars=max_chars)
+    if not chunks:
+        raise LookupError(query)
+    return tuple(chunks)
+
+
+def _cached_retrieve(query: str, k: int, max_chars: int) -> Tuple[str, ...]:
+    """
+    Начала фрагментов базы знаний для запроса (не длиннее max_chars).
+
+    Одинаковые с точностью до регистра и пробелов запросы ищутся один раз;
+    в кэше хранятся уже обрезанные фрагменты.
+    """
+    try:
+        return _retrieve_chunks(" ".join(query.lower().split()), k, max_chars)
+    except LookupError:
+        return ()
+
 # ===============================
 #  Основной класс Interviewer с RAG
 # ===============================
 class InterviewerAgent:
-    def __init__(self, use_rag: bool = True):
-        self.llm = GigaChat(
-            credentials=os.getenv("GIGACHAT_CLIENT_SECRET"),
-            verify_ssl_certs=False,
-            model="GigaChat"  # ← ДОБАВИЛ: явное указание модели
-        )
-
+    def __init__(self, use_rag: bool = True, use_cache: bool = True,
+                 session_store: Optional[SessionStore] = None):
         self.use_rag = use_rag and RAG_AVAILABLE
-        self.active_sessions: Dict[str, InterviewSession] = {}
+        # Активные сессии; Redis позволяет запускать несколько воркеров бота
+        self._store = session_store or default_session_store(InterviewSession)
+
+        # Сгенерированные вопросы: ключ — тема, все остальное, от чего зависит промпт, —
+        # в namespace. Для похожей формулировки темы годятся те же вопросы
+        self._llm_cache = SemanticCache(threshold=0.95) if use_cache and CACHE_AVAILABLE else None
+        # Оценки, подсказки и рекомендации относятся к конкретному ответу/вопросу,
+        # поэтому кэшируются только по точному совпадению всего, что попадает в промпт
+        self._result_cache = ResultCache() if use_cache else None
+
+    @cached_property
+    def llm(self):
+        """Общий клиент GigaChat: соединение и токен переиспользуются между запросами"""
+        return get_gigachat("GigaChat")
+
+    def _cache_get(self, text: str, namespace: str):
+        """Ранее полученный результат LLM для похожего запроса или None"""
+        if self._llm_cache is None:
+            return None
+        try:
+            return self._llm_cache.get(text, namespace=namespace)
+        except Exception as e:
+            # Сбой кэша — это промах, а не повод отдавать вопросы по умолчанию
+            print(f"⚠️  Ошибка кэша в Interviewer: {e}")
+            return None
+
+    def _cache_put(self, text: str, namespace: str, value):
+        """Сохраняет успешно разобранный результат LLM"""
+        if self._llm_cache is None:
+            return
+        try:
+            self._llm_cache.put(text, value, namespace=namespace)
+        except Exception as e:
+            print(f"⚠️  Ошибка кэша в Interviewer: {e}")
+
+    def _result_get(self, key: Tuple[str, ...]):
+        """Ранее полученный результат LLM для того же промпта или None"""
+        if self._result_cache is None:
+            return None
+        return self._result_cache.get(key)
+
+    def _result_put(self, key: Tuple[str, ...], value):
+        """Сохраняет результат LLM под точным ключом"""
+        if self._result_cache is not None:
+            self._result_cache.put(key, value)
 
     def _get_rag_context_for_questions(self, topic: str, level: str, track: str = None) -> str:
         """Получает контекст из RAG для генерации вопросов"""
@@ -84,12 +416,12 @@ class InterviewerAgent:
                 query_parts.append(track)
             query = " ".join(query_parts) + " собеседование вопросы"
 
-            context_chunks = retrieve_context(query, k=3)
+            context_chunks = _cached_retrieve(query, 3, max_chars=300)
 
             if context_chunks:
                 return "\n".join([
-                    f"Пример {i + 1}: {chunk[:300]}..."
-                    for i, chunk in enumerate(context_chunks)
+                    f"Пример {i}: {chunk}..."
+                    for i, chunk in enumerate(context_chunks, 1)
                 ])
             return ""
 
@@ -99,31 +431,36 @@ class InterviewerAgent:
 
     def _extract_json(self, text: str) -> dict:
         """Безопасно достаёт JSON из ответа"""
-        # Очистка от Markdown блоков
-        if "```json" in text:
-            text = text.split("```json")[1].split("```")[0].strip()
-        elif "```" in text:
-            text = text.strip("`").strip()
-
-        # Поиск JSON в тексте
-        import re
-        json_match = re.search(r'\{.*\}', text, re.DOTALL)
-        if json_match:
+        # Границы Markdown-блока ```json ... ``` — только индексы, без промежуточных строк
+        start, end = 0, len(text)
+        fence = text.find("```json")
+        if fence != -1:
+            start = fence + 7
+            close = text.find("```", start)
+            if close != -1:
+                end = close
+
+        # JSON-объект — от первой "{" до последней "}" внутри блока
+        obj_start = text.find("{", start, end)
+        obj_end = text.rfind("}", start, end)
+        if obj_start != -1 and obj_end > obj_start:
             try:
-                return json.loads(json_match.group())
-            except:
+                return json_loads(text[obj_start:obj_end + 1])
+            except ValueError:
                 pass
 
-        # Если не нашли JSON, пробуем распарсить весь текст
-        try:
-            return json.loads(text)
-        except:
-            raise ValueError(f"Не удалось извлечь JSON из ответа: {text[:200]}")
-
-    def start_interview(self, topic: str, level: str = "middle",
-                        user_context: Dict = None, session_id: str = None) -> InterviewSession:
-        """Начинает новое интервью по теме"""
+        # Если не нашли JSON, пробуем распарсить весь текст — но только если он похож на объект
+        text = text[start:end].strip().strip("`").strip()
+        if text[:1] == "{":
+            try:
+                return json_loads(text)
+            except ValueError:
+                pass
+        raise ValueError(f"Не удалось извлечь JSON из ответа: {text[:200]}")
 
+    def _interview_params(self, topic: str, level: str, user_context: Optional[Dict],
+                          session_id: Optional[str]) -> Tuple[Dict, str, str, str]:
+        """Контекст пользователя, направление, уровень и id сессии с учетом значений по умолчанию"""
         if user_context is None:
             user_context = {}
 
@@ -131,112 +468,54 @@ class InterviewerAgent:
         user_level = user_context.get('level', level)
 
         if not session_id:
-            session_id = f"interview_{datetime.now().strftime('%Y%m%d_%H%M%S')}_{topic[:20]}"
+            session_id = f"interview_{time.strftime('%Y%m%d_%H%M%S')}_{topic[:20]}"
 
-        # Получаем контекст из RAG
-        rag_context = self._get_rag_context_for_questions(topic, user_level, track)
+        # Бот передает целочисленный id сессии из БД; в InterviewSession id — строка
+        return user_context, track, user_level, str(session_id)
 
-        # Промпт для генерации вопросов
+    def _questions_prompt(self, topic: str, user_level: str, track: str, rag_context: str) -> Tuple[str, bool]:
+        """Промпт для генерации вопросов и признак того, что в нем есть контекст из RAG"""
         if rag_context:
-            prompt = f"""
-Ты — опытный технический интервьюер. У тебя есть доступ к базе вопросов.
-
-КОНТЕКСТ ИЗ БАЗЫ ЗНАНИЙ:
-{rag_context}
-
-КОНТЕКСТ ПОЛЬЗОВАТЕЛЯ:
-- Уровень: {user_level}
-- Направление: {track}
-
-Сгенерируй 3 уникальных вопроса по теме: {topic}
-Вопросы должны соответствовать уровню {user_level}.
-
-Формат строго JSON:
-{{
-  "questions": [
-    {{
-      "topic": "конкретная подтема",
-      "question": "текст вопроса",
-      "expected_concepts": ["концепция1", "концепция2", "концепция3"],
-      "difficulty": "easy/medium/hard",
-      "hints": ["подсказка 1", "подсказка 2"]
-    }}
-  ]
-}}
-
-Создай 1 легкий, 1 средний и 1 сложный вопрос.
-"""
-            rag_used = True
-        else:
-            prompt = f"""
-Ты — опытный технический интервьюер.
-
-КОНТЕКСТ ПОЛЬЗОВАТЕЛЯ:
-- Уровень: {user_level}
-- Направление: {track}
-
-Сгенерируй 3 вопроса по теме: {topic}
-Вопросы должны соответствовать уровню {user_level}.
-
-Формат строго JSON:
-{{
-  "questions": [
-    {{
-      "topic": "конкретная подтема",
-      "question": "текст вопроса",
-      "expected_concepts": ["концепция1", "концепция2"],
-      "difficulty": "easy/medium/hard",
-      "hints": ["подсказка при затруднении"]
-    }}
-  ]
-}}
-"""
-            rag_used = False
-
-        # Генерируем вопросы
-        try:
-            response = self.llm.chat(prompt)
-            data = self._extract_json(response.choices[0].message.content)
-
-            questions = []
-            for q_data in data.get("questions", [])[:3]:  # Берем максимум 3 вопроса
-                questions.append(InterviewQuestion(
-                    topic=q_data.get("topic", topic),
-                    question=q_data.get("question", f"Расскажите о {topic}"),
-                    expected_concepts=q_data.get("expected_concepts", [topic]),
-                    difficulty=q_data.get("difficulty", "medium"),
-                    hints=q_data.get("hints", []),
-                    rag_context_used=rag_used
-                ))
-
-        except Exception as e:
-            print(f"❌ Ошибка генерации вопросов: {e}")
-            # Fallback вопросы
-            questions = [
-                InterviewQuestion(
-                    topic=topic,
-                    question=f"Что вы знаете о {topic}?",
-                    expected_concepts=[topic, "базовые принципы"],
-                    difficulty="easy",
-                    rag_context_used=False
-                ),
-                InterviewQuestion(
-                    topic=topic,
-                    question=f"Приведите пример использования {topic}",
-                    expected_concepts=["практическое применение"],
-                    difficulty="medium",
-                    rag_context_used=False
-                ),
-                InterviewQuestion(
-                    topic=topic,
-                    question=f"Какие проблемы могут возникнуть при работе с {topic} и как их решить?",
-                    expected_concepts=["проблемы", "решения"],
-                    difficulty="hard",
-                    rag_context_used=False
-                )
-            ]
-
-        # Создаем сессию
+            prefix, suffix = _questions_prompt_parts(user_level, track, topic)
+            return prefix + rag_context + suffix, True
+
+        return _questions_prompt_without_rag(user_level, track, topic), False
+
+    def _parse_questions(self, content: str, topic: str, rag_used: bool) -> List[InterviewQuestion]:
+        """Достает вопросы из ответа модели"""
+        data = self._extract_json(content)
+        questions_data = data.get("questions", [])[:3]  # Берем максимум 3 вопроса
+        return self._build_questions(questions_data, topic, rag_used)
+
+    def _build_questions(self, questions_data: list, topic: str, rag_used: bool) -> List[InterviewQuestion]:
+        """
+        Создает объекты вопросов из данных модели.
+
+        Данные пришли от LLM, поэтому проходят валидацию: строка вместо списка
+        или неверный тип поля — ошибка, и вызывающий метод берет вопросы по умолчанию.
+        """
+        return _QUESTIONS_ADAPTER.validate_python([
+            {
+                "topic": q_data.get("topic", topic),
+                "question": q_data.get("question", f"Расскажите о {topic}"),
+                "expected_concepts": q_data.get("expected_concepts") or [topic],
+                "difficulty": q_data.get("difficulty", "medium"),
+                "hints": q_data.get("hints") or [],
+                "similar_questions": q_data.get("similar_questions") or [],
+                "rag_context_used": rag_used
+            }
+            for q_data in questions_data
+        ])
+
+    def _fallback_questions(self, topic: str, e: Exception) -> List[InterviewQuestion]:
+        """Вопросы по умолчанию, если сгенерировать их не удалось"""
+        print(f"❌ Ошибка генерации вопросов: {e}")
+        # Вопросы неизменяемые, поэтому сессии могут делить одни и те же объекты
+        return list(_fallback_template(topic))
+
+    def _new_session(self, session_id: str, topic: str, user_level: str,
+                     questions: List[InterviewQuestion], user_context: Dict) -> InterviewSession:
+        """Создает сессию (сохраняет ее в хранилище вызывающий метод)"""
         session = InterviewSession(
             id=session_id,
             topic=topic,
@@ -245,13 +524,67 @@ class InterviewerAgent:
             started_at=datetime.now().isoformat(),
             user_context=user_context  # ← СОХРАНЯЕМ контекст
         )
+        return session
+
+    def start_interview(self, topic: str, level: str = "middle",
+                        user_context: Dict = None, session_id: str = None) -> InterviewSession:
+        """Начинает новое интервью по теме"""
+        user_context, track, user_level, session_id = self._interview_params(
+            topic, level, user_context, session_id
+        )
+
+        # Получаем контекст из RAG
+        rag_context = self._get_rag_context_for_questions(topic, user_level, track)
+        prompt, rag_used = self._questions_prompt(topic, user_level, track, rag_context)
+
+        # Генерируем вопросы (или берем сгенерированные ранее для той же темы и уровня)
+        # Вопросы неизменяемые, поэтому в кэше лежат готовые объекты
+        cache_namespace = f"questions|{user_level}|{track}|{rag_used}"
+        questions = self._cache_get(topic, cache_namespace)
+        if questions is None:
+            try:
+                content = stream_until_json(self.llm, prompt)
+                questions = self._parse_questions(content, topic, rag_used)
+            except Exception as e:
+                questions = self._fallback_questions(topic, e)
+            else:
+                if questions:
+                    self._cache_put(topic, cache_namespace, questions)
+
+        # Список у каждой сессии свой: подсказки заменяют в нем вопросы по индексу
+        session = self._new_session(session_id, topic, user_level, list(questions), user_context)
+        self._store.put(session)
+        return session
+
+    async def astart_interview(self, topic: str, level: str = "middle",
+                               user_context: Dict = None, session_id: str = None) -> InterviewSession:
+        """Асинхронная версия start_interview: RAG, кэш и запрос к GigaChat не блокируют event loop"""
+        user_context, track, user_level, session_id = self._interview_params(
+            topic, level, user_context, session_id
+        )
+
+        rag_context = await asyncio.to_thread(self._get_rag_context_for_questions, topic, user_level, track)
+        prompt, rag_used = self._questions_prompt(topic, user_level, track, rag_context)
+
+        cache_namespace = f"questions|{user_level}|{track}|{rag_used}"
+        questions = await asyncio.to_thread(self._cache_get, topic, cache_namespace)
+        if questions is None:
+            try:
+                content = await astream_until_json(self.llm, prompt)
+                questions = self._parse_questions(content, topic, rag_used)
+            except Exception as e:
+                questions = self._fallback_questions(topic, e)
+            else:
+                if questions:
+                    await asyncio.to_thread(self._cache_put, topic, cache_namespace, questions)
 
-        self.active_sessions[session_id] = session
+        session = self._new_session(session_id, topic, user_level, list(questions), user_context)
+        await self._store.aput(session)
         return session
 
     def get_current_question(self, session_id: str) -> Optional[InterviewQuestion]:
         """Получает текущий вопрос из сессии"""
-        session = self.active_sessions.get(session_id)
+        session = self._store.get(session_id)
         if not session:
             return None
 
@@ -259,11 +592,11 @@ class InterviewerAgent:
             return session.questions[session.current_question_index]
         return None
 
-    def evaluate_answer(self, session_id: str, answer: str) -> InterviewScore:
-        """Оценивает ответ на текущий вопрос"""
-        session = self.active_sessions.get(session_id)
+    def _evaluation_state(self, session: Optional[InterviewSession]
+                          ) -> Tuple[Optional[InterviewSession], Optional[InterviewScore]]:
+        """Сессия для оценки ответа или готовый результат, если оценивать нечего"""
         if not session:
-            return InterviewScore(
+            return None, InterviewScore(
                 score=0,
                 comment="Сессия не найдена",
                 strong_points=[],
@@ -271,112 +604,142 @@ class InterviewerAgent:
             )
 
         if session.current_question_index >= len(session.questions):
-            return InterviewScore(
+            return None, InterviewScore(
                 score=0,
                 comment="Все вопросы пройдены",
                 strong_points=[],
                 weak_points=[]
             )
 
-        current_question = session.questions[session.current_question_index]
-        user_level = session.user_context.get('level', 'middle') if session.user_context else 'middle'
-
-        # Получаем RAG контекст для оценки
-        rag_context = ""
-        if self.use_rag and current_question.expected_concepts:
-            try:
-                query = f"{current_question.topic} {user_level} правильный ответ"
-                context_chunks = retrieve_context(query, k=2)
-                if context_chunks:
-                    rag_context = "\n".join([f"- {chunk[:200]}" for chunk in context_chunks])
-            except Exception as e:
-                print(f"⚠️  Ошибка RAG при оценке: {e}")
+        return session, None
 
-        # Промпт для оценки
-        if rag_context:
-            prompt = f"""
-Ты — технический интервьюер.
+    def _get_rag_context_for_evaluation(self, question: InterviewQuestion, user_level: str) -> str:
+        """Получает RAG контекст для оценки ответа"""
+        if not self.use_rag or not question.expected_concepts:
+            return ""
 
-КОНТЕКСТ ПОЛЬЗОВАТЕЛЯ:
-- Уровень: {user_level}
+        try:
+            query = f"{question.topic} {user_level} правильный ответ"
+            context_chunks = _cached_retrieve(query, 2, max_chars=200)
+            if context_chunks:
+                return "\n".join([f"- {chunk}" for chunk in context_chunks])
+        except Exception as e:
+            print(f"⚠️  Ошибка RAG при оценке: {e}")
 
-ИНФОРМАЦИЯ ДЛЯ ОЦЕНКИ:
-{rag_context}
+        return ""
 
-ВОПРОС: {current_question.question}
-ОЖИДАЕМЫЕ КОНЦЕПЦИИ: {', '.join(current_question.expected_concepts)}
+    def _evaluation_prompt(self, question: InterviewQuestion, answer: str, user_level: str,
+                           rag_context: str) -> str:
+        """Промпт для оценки ответа"""
+        prefix, suffix = _evaluation_prompt_parts(
+            user_level, rag_context, question.question, ', '.join(question.expected_concepts)
+        )
+        return prefix + answer + suffix
+
+    def _parse_evaluation(self, content: str, cache_key: Tuple[str, ...]) -> dict:
+        """Достает оценку из ответа модели и сохраняет ее в кэш"""
+        data = self._extract_json(content)
+        self._result_put(cache_key, data)
+        return data
+
+    def _record_score(self, session: InterviewSession, data: dict) -> InterviewScore:
+        """Записывает оценку в сессию и переходит к следующему вопросу (сессию сохраняет вызывающий)"""
+        # Оценка приходит от LLM: валидируем до изменения сессии; дробный балл приводим к int сами
+        score = InterviewScore(
+            score=int(data.get("score", 50)),
+            comment=data.get("comment", "Ответ принят"),
+            strong_points=data.get("strong_points") or [],
+            weak_points=data.get("weak_points") or [],
+            recommended_resources=data.get("recommended_resources") or []
+        )
 
-ОТВЕТ КАНДИДАТА: {answer}
+        # Сохраняем и переходим дальше
+        session.scores.append(score)
+        session.current_question_index += 1
+
+        return score
+
+    def _evaluation_error_score(self, e: Exception) -> InterviewScore:
+        """Оценка по умолчанию при технической ошибке"""
+        print(f"❌ Ошибка оценки ответа: {e}")
+        return InterviewScore(
+            score=50,
+            comment="Техническая ошибка при оценке",
+            strong_points=["Ответ предоставлен"],
+            weak_points=["Требуется более детальный разбор"],
+            recommended_resources=[]
+        )
 
-Оцени ответ кандидата уровня {user_level} по шкале 0-100.
-Учти, что для уровня {user_level} требования соответствующие.
+    def evaluate_answer(self, session_id: str, answer: str) -> InterviewScore:
+        """Оценивает ответ на текущий вопрос"""
+        session, result = self._evaluation_state(self._store.get(session_id))
+        if session is None:
+            return result
 
-Формат строго JSON:
-{{
-  "score": число от 0 до 100,
-  "comment": "детальный фидбек, что правильно, что можно улучшить",
-  "strong_points": ["сильные стороны ответа"],
-  "weak_points": ["что нужно улучшить"],
-  "recommended_resources": ["рекомендации по изучению"]
-}}
-"""
-        else:
-            prompt = f"""
-Ты — технический интервьюер.
+        if not answer.strip():
+            score = self._record_score(session, _EMPTY_EVALUATION)
+            self._store.put(session)
+            return score
 
-КОНТЕКСТ:
-- Уровень кандидата: {user_level}
+        current_question = session.questions[session.current_question_index]
+        user_level = session.user_context.get('level', 'middle') if session.user_context else 'middle'
 
-ВОПРОС: {current_question.question}
-ОЖИДАЕМЫЕ КОНЦЕПЦИИ: {', '.join(current_question.expected_concepts)}
+        # Получаем RAG контекст для оценки
+        rag_context = self._get_rag_context_for_evaluation(current_question, user_level)
+        prompt = self._evaluation_prompt(current_question, answer, user_level, rag_context)
 
-ОТВЕТ КАНДИДАТА: {answer}
+        cache_key = ("evaluate", current_question.question, user_level, str(bool(rag_context)), answer)
+        try:
+            data = self._result_get(cache_key)
+            if data is None:
+                content = stream_until_json(self.llm, prompt)
+                data = self._parse_evaluation(content, cache_key)
+            score = self._record_score(session, data)
+        except Exception as e:
+            return self._evaluation_error_score(e)
 
-Оцени ответ кандидата уровня {user_level} по шкале 0-100.
+        self._store.put(session)
+        return score
 
-Формат строго JSON:
-{{
-  "score": число от 0 до 100,
-  "comment": "конструктивный фидбек",
-  "strong_points": ["что хорошо в ответе"],
-  "weak_points": ["что нужно доработать"]
-}}
-"""
+    async def aevaluate_answer(self, session_id: str, answer: str) -> InterviewScore:
+        """Асинхронная версия evaluate_answer"""
+        session, result = self._evaluation_state(await self._store.aget(session_id))
+        if session is None:
+            return result
 
-        try:
-            response = self.llm.chat(prompt)
-            data = self._extract_json(response.choices[0].message.content)
-
-            score = InterviewScore(
-                score=data.get("score", 50),
-                comment=data.get("comment", "Ответ принят"),
-                strong_points=data.get("strong_points", []),
-                weak_points=data.get("weak_points", []),
-                recommended_resources=data.get("recommended_resources", [])
-            )
+        if not answer.strip():
+            score = self._record_score(session, _EMPTY_EVALUATION)
+            await self._store.aput(session)
+            return score
 
-            # Сохраняем и переходим дальше
-            session.scores.append(score)
-            session.current_question_index += 1
+        current_question = session.questions[session.current_question_index]
+        user_level = session.user_context.get('level', 'middle') if session.user_context else 'middle'
 
-            return score
+        rag_context = await asyncio.to_thread(self._get_rag_context_for_evaluation, current_question, user_level)
+        prompt = self._evaluation_prompt(current_question, answer, user_level, rag_context)
 
+        cache_key = ("evaluate", current_question.question, user_level, str(bool(rag_context)), answer)
+        try:
+            data = self._result_get(cache_key)
+            if data is None:
+                content = await astream_until_json(self.llm, prompt)
+                data = await asyncio.to_thread(self._parse_evaluation, content, cache_key)
+            score = self._record_score(session, data)
         except Exception as e:
-            print(f"❌ Ошибка оценки ответа: {e}")
-            return InterviewScore(
-                score=50,
-                comment="Техническая ошибка при оценке",
-                strong_points=["Ответ предоставлен"],
-                weak_points=["Требуется более детальный разбор"],
-                recommended_resources=[]
-            )
+            return self._evaluation_error_score(e)
+
+        await self._store.aput(session)
+        return score
 
     def get_interview_summary(self, session_id: str) -> Dict:
         """Получает итоговую статистику по интервью"""
-        session = self.active_sessions.get(session_id)
+        session = self._store.get(session_id)
         if not session:
             return {"error": "Сессия не найдена"}
+        return self._summary(session)
 
+    def _summary(self, session: InterviewSession) -> Dict:
+        """Итоговая статистика по уже загруженной сессии"""
         if not session.scores:
             return {
                 "status": "active",
@@ -398,103 +761,220 @@ class InterviewerAgent:
         else:
             level = "Требует улучшений"
 
-        # Собираем все сильные/слабые стороны
-        all_strong = []
-        all_weak = []
-        for score in session.scores:
-            all_strong.extend(score.strong_points or [])
-            all_weak.extend(score.weak_points or [])
-
-        # Удаляем дубликаты
-        all_strong = list(set(all_strong))
-        all_weak = list(set(all_weak))
+        # Первые 5 уникальных сильных/слабых сторон (в порядке ответов)
+        all_strong = _top_k_unique(score.strong_points for score in session.scores)
+        all_weak = _top_k_unique(score.weak_points for score in session.scores)
 
         return {
-            "session_id": session_id,
+            "session_id": session.id,
             "topic": session.topic,
             "user_level": session.level,
             "total_questions": len(session.questions),
             "completed": len(session.scores),
             "average_score": round(average_score, 1),
             "performance": level,
-            "strong_points": all_strong[:5],
-            "weak_points": all_weak[:5],
+            "strong_points": all_strong,
+            "weak_points": all_weak,
             "started_at": session.started_at
         }
 
+    def _save_hints(self, session: InterviewSession, hints: list):
+        """
+        Запоминает подсказки в текущем вопросе сессии (вопрос неизменяемый — заменяем копией).
+
+        Сессию в хранилище сохраняет вызывающий метод.
+        """
+        index = session.current_question_index
+        session.questions[index] = session.questions[index].model_copy(update={"hints": list(hints)})
+
+    def _hints_prompt(self, question: InterviewQuestion, level: str) -> str:
+        """Промпт для подсказок к вопросу"""
+        return _fmt_hints(question=question.question, topic=question.topic, level=level)
+
     def get_hints(self, session_id: str) -> List[str]:
         """Получает подсказки для текущего вопроса"""
-        session = self.active_sessions.get(session_id)
+        session = self._store.get(session_id)
         if not session:
             return ["Сессия не найдена"]
 
-        current_question = self.get_current_question(session_id)
-        if not current_question:
+        if session.current_question_index >= len(session.questions):
             return ["Интервью завершено"]
+        current_question = session.questions[session.current_question_index]
 
         # Если есть готовые подсказки, возвращаем их
         if current_question.hints:
             return current_question.hints
 
-        # Генерируем на лету
-        prompt = f"""
-Вопрос для интервью: {current_question.question}
-Тема: {current_question.topic}
-Уровень кандидата: {session.level}
+        # Генерируем на лету (или берем подсказки, полученные ранее для того же вопроса)
+        cache_key = ("hints", session.level, current_question.topic, current_question.question)
+        try:
+            hints = self._result_get(cache_key)
+            if hints is None:
+                response = self.llm.chat(self._hints_prompt(current_question, session.level))
+                content = response.choices[0].message.content
+
+                # Извлекаем список
+                list_match = _LIST_RE.search(content)
+                if list_match:
+                    hints = json_loads(list_match.group())[:2]
+                    self._result_put(cache_key, hints)
+
+            if hints is not None:
+                self._save_hints(session, hints)
+                self._store.put(session)
+                return list(hints)
+        except Exception as e:
+            print(f"⚠️  Ошибка генерации подсказок: {e}")
+
+        return list(_DEFAULT_HINTS)
+
+    async def _astream_list_items(self, prompt: str, limit: int) -> AsyncIterator[str]:
+        """
+        Читает потоковый ответ GigaChat и отдает элементы JSON-списка по мере готовности.
+
+        Элемент отдается, как только в потоке закрылась его строка; после limit
+        элементов поток закрывается, не дожидаясь конца ответа.
+        """
+        parts = []
+        sent = 0
+        async with aclosing(self.llm.astream(prompt)) as stream:
+            async for chunk in stream:
+                delta = chunk.choices[0].delta.content or ""
+                parts.append(delta)
+
+                if '"' not in delta and "]" not in delta:
+                    continue
+
+                text = "".join(parts)
+                start = text.find("[")
+                if start == -1:
+                    continue
+                try:
+                    items = from_json(text[start:], allow_partial=True)
+                except ValueError:
+                    continue
+
+                for item in items[sent:limit]:
+                    yield str(item)
+                sent = max(sent, min(len(items), limit))
+                if sent >= limit:
+                    return
+
+    async def astream_hints(self, session_id: str) -> AsyncIterator[str]:
+        """Асинхронная версия get_hints: подсказки отдаются по одной, по мере генерации"""
+        session = await self._store.aget(session_id)
+        if not session:
+            yield "Сессия не найдена"
+            return
 
-Дай 2 подсказки, которые помогут кандидату уровня {session.level} ответить на вопрос.
-Подсказки должны быть конкретными и полезными.
+        if session.current_question_index >= len(session.questions):
+            yield "Интервью завершено"
+            return
+        current_question = session.questions[session.current_question_index]
 
-Формат: ["подсказка 1", "подсказка 2"]
-"""
+        if current_question.hints:
+            for hint in current_question.hints:
+                yield hint
+            return
 
+        cache_key = ("hints", session.level, current_question.topic, current_question.question)
+        hints = []
         try:
-            response = self.llm.chat(prompt)
-            content = response.choices[0].message.content
+            cached = self._result_get(cache_key)
+            if cached is not None:
+                hints = list(cached)
+            else:
+                prompt = self._hints_prompt(current_question, session.level)
+                # Подсказки из частично разобранного потока сохраняются только в сессии:
+                # в общий кэш идет лишь полностью разобранный ответ (get_hints)
+                async for hint in self._astream_list_items(prompt, limit=2):
+                    hints.append(hint)
+                    yield hint
+                if hints:
+                    self._save_hints(session, hints)
+                    await self._store.aput(session)
+                    return
+        except Exception as e:
+            print(f"⚠️  Ошибка генерации подсказок: {e}")
+            if hints:
+                return
+
+        if hints:
+            self._save_hints(session, hints)
+            await self._store.aput(session)
+        for hint in hints or _DEFAULT_HINTS:
+            yield hint
+
+    def _recommendations_prompt(self, weak_points: List[str]) -> str:
+        """Промпт для рекомендаций по слабым сторонам"""
+        return _fmt_recommendations(weak_points=', '.join(weak_points[:3]))
+
+    def _parse_recommendations(self, content: str, cache_key: Tuple[str, ...]) -> Optional[list]:
+        """Достает список рекомендаций из ответа модели и сохраняет его в кэш"""
+        list_match = _LIST_RE.search(content)
+        if not list_match:
+            return None
 
-            # Извлекаем список
-            import re
-            list_match = re.search(r'\[.*\]', content, re.DOTALL)
-            if list_match:
-                hints = json.loads(list_match.group())
-                current_question.hints = hints[:2]
-                return hints[:2]
-        except:
-            pass
+        recommendations = json_loads(list_match.group())
+        self._result_put(cache_key, recommendations)
+        return recommendations
 
-        return ["Подумайте о ключевых концепциях", "Приведите практический пример"]
+    def _resources_from_scores(self, session: InterviewSession) -> list:
+        """Первые 3 уникальных ресурса, которые модель рекомендовала при оценке ответов"""
+        return _top_k_unique((score.recommended_resources for score in session.scores), k=3)
 
     def end_interview(self, session_id: str) -> Dict:
         """Завершает интервью"""
-        summary = self.get_interview_summary(session_id)
-
-        if "error" not in summary:
-            # Генерируем рекомендации
-            weak_points = summary.get("weak_points", [])
-            if weak_points:
-                prompt = f"""
-На основе слабых сторон: {', '.join(weak_points[:3])}
-Дай 3 конкретные рекомендации для улучшения.
+        session = self._store.get(session_id)
+        if not session:
+            return {"error": "Сессия не найдена"}
+        summary = self._summary(session)
 
-Формат: ["рекомендация 1", "рекомендация 2", "рекомендация 3"]
-"""
-                try:
-                    response = self.llm.chat(prompt)
-                    content = response.choices[0].message.content
-
-                    import re
-                    list_match = re.search(r'\[.*\]', content, re.DOTALL)
-                    if list_match:
-                        summary["recommendations"] = json.loads(list_match.group())
-                except:
-                    summary["recommendations"] = [
-                        "Практиковаться на LeetCode/HackerRank",
-                        "Изучать документацию и best practices",
-                        "Проходить больше mock интервью"
-                    ]
-
-            # Удаляем сессию
-            if session_id in self.active_sessions:
-                del self.active_sessions[session_id]
-
-        return summary
\ No newline at end of file
+        # Генерируем рекомендации
+        weak_points = summary.get("weak_points", [])
+        if weak_points:
+            cache_key = ("recommendations", ", ".join(weak_points[:3]))
+            try:
+                # Ресурсы из оценок ответов, если модель их дала; иначе — отдельный запрос
+                recommendations = (self._resources_from_scores(session)
+                                   or self._result_get(cache_key))
+                if recommendations is None:
+                    response = self.llm.chat(self._recommendations_prompt(weak_points))
+                    recommendations = self._parse_recommendations(response.choices[0].message.content, cache_key)
+
+                if recommendations is not None:
+                    summary["recommendations"] = list(recommendations)
+            except Exception as e:
+                print(f"⚠️  Ошибка генерации рекомендаций: {e}")
+                summary["recommendations"] = list(_DEFAULT_RECOMMENDATIONS)
+
+        self._store.delete(session_id)
+        return summary
+
+    async def aend_interview(self, session_id: str) -> Dict:
+        """Асинхронная версия end_interview"""
+        session = await self._store.aget(session_id)
+        if not session:
+            return {"error": "Сессия не найдена"}
+        summary = self._summary(session)
+
+        weak_points = summary.get("weak_points", [])
+        if weak_points:
+            cache_key = ("recommendations", ", ".join(weak_points[:3]))
+            try:
+                recommendations = (self._resources_from_scores(session)
+                                   or self._result_get(cache_key))
+                if recommendations is None:
+                    response = await self.llm.achat(self._recommendations_prompt(weak_points))
+                    recommendations = await asyncio.to_thread(
+                        self._parse_recommendations, response.choices[0].message.content, cache_key
+                    )
+
+                if recommendations is not None:
+                    summary["recommendations"] = list(recommendations)
+            except Exception as e:
+                print(f"⚠️  Ошибка генерации рекомендаций: {e}")
+                summary["recommendations"] = list(_DEFAULT_RECOMMENDATIONS)
+
+        await self._store.adelete(session_id)
+        return summary
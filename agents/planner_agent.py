@@ -1,20 +1,23 @@
 # agents/planner_agent.py
+import asyncio
+import functools
 import json
 import sys
 from pathlib import Path
-from pydantic import BaseModel
-from gigachat import GigaChat
-from dotenv import load_dotenv
-import os
-from typing import List, Dict, Optional
+from pydantic import BaseModel, ConfigDict, Field, TypeAdapter, model_validator
+from typing import List, Dict, Optional, Tuple
 from datetime import datetime, timedelta
+from functools import cached_property
+
+from agents._llm import astream_until_json, get_gigachat, stream_until_json
+from agents._templates import compile_template
 
 # Добавляем путь для импорта RAG
 sys.path.append(str(Path(__file__).resolve().parent.parent))
 
 # Импортируем RAG
 try:
-    from rag.retriever import retrieve_context, search_similar
+    from rag.retriever import retrieve_context
 
     RAG_AVAILABLE = True
 except ImportError:
@@ -22,53 +25,26 @@ except ImportError:
     RAG_AVAILABLE = False
 
 
-    def retrieve_context(query: str, k: int = 4) -> List[str]:
-        return []
-
-
-    def search_similar(query: str, k: int = 5) -> List[Dict]:
+    def retrieve_context(query: str, k: int = 3, **kwargs) -> List[str]:
         return []
 
-load_dotenv()
-
-
-# ===============================
-#  Модели данных
-# ===============================
-class LearningGoal(BaseModel):
-    week: int
-    title: str
-    description: str
-    topics: List[str]
-    tasks: List[str]
-    resources: List[str]
-    estimated_hours: int
-    success_criteria: List[str]
-
-
-class PlanResult(BaseModel):
-    plan: List[LearningGoal]
-    summary: str
-    total_weeks: int
-    total_hours: int
-    focus_areas: List[str]
-    rag_context_used: bool = False
+# Семантический кэш ответов LLM (нужен numpy)
+try:
+    from rag.semantic_cache import SemanticCache
 
+    CACHE_AVAILABLE = True
+except ImportError:
+    CACHE_AVAILABLE = False
 
-# ===============================
-#  Основной класс Planner с RAG
-# ===============================
-class PlannerAgent:
-    def __init__(self, use_rag: bool = True):
-        self.llm = GigaChat(
-            credentials=os.getenv("GIGACHAT_CLIENT_SECRET"),
-            verify_ssl_certs=False
-        )
+# Быстрый парсер JSON (если установлен)
+try:
+    from orjson import loads as json_loads
+except ImportError:
+    json_loads = json.loads
 
-        self.use_rag = use_rag and RAG_AVAILABLE
 
-        # Промпты
-        self.planning_prompt_without_rag = """
+# Промпты: статичный текст разбирается один раз при импорте, на вызове — только склейка строк
+_PLANNING_PROMPT_WITHOUT_RAG = """
         Ты — AI-планировщик для подготовки к техническим собеседованиям.
 
         Создай детальный план обучения на {weeks} недель для пользователя с описанием: "{user_text}"
@@ -96,7 +72,7 @@ class PlannerAgent:
         }}
         """
 
-        self.planning_prompt_with_rag = """
+_PLANNING_PROMPT_WITH_RAG = """
         Ты — AI-планировщик с доступом к базе знаний о подготовке к собеседованиям.
 
         КОНТЕКСТ ИЗ БАЗЫ ЗНАНИЙ (материалы, ресурсы, советы):
@@ -134,43 +110,187 @@ class PlannerAgent:
         }}
         """
 
+_fmt_planning_without_rag = compile_template(_PLANNING_PROMPT_WITHOUT_RAG)
+_fmt_planning_with_rag = compile_template(_PLANNING_PROMPT_WITH_RAG)
+
+
+# ===============================
+#  Модели данных
+# ===============================
+class LearningGoal(BaseModel):
+    model_config = ConfigDict(frozen=True)
+
+    week: int = 1
+    title: str
+    description: str = ""
+    topics: List[str] = Field(default_factory=list)
+    tasks: List[str] = Field(default_factory=list)
+    resources: List[str] = Field(default_factory=list)
+    estimated_hours: int = 10
+    success_criteria: List[str] = Field(default_factory=list)
+
+    @model_validator(mode="before")
+    @classmethod
+    def _default_title(cls, data):
+        # Модель не всегда присылает заголовок недели
+        if isinstance(data, dict) and "title" not in data:
+            data = {**data, "title": f"Неделя {data.get('week', 1)}"}
+        return data
+
+
+class PlanResult(BaseModel):
+    model_config = ConfigDict(frozen=True)
+
+    plan: List[LearningGoal]
+    summary: str
+    total_weeks: int
+    total_hours: int
+    focus_areas: List[str]
+    rag_context_used: bool = False
+
+
+# Список недель валидируется и сериализуется целиком в pydantic-core, без цикла по элементам
+_PLAN_ADAPTER = TypeAdapter(List[LearningGoal])
+
+
+@functools.lru_cache(maxsize=64)
+def _fallback_template(track: str, weeks: int) -> Tuple[LearningGoal, ...]:
+    """
+    Базовый план на случай ошибки.
+
+    Зависит только от трека и числа недель, а LearningGoal неизменяемы,
+    поэтому недели собираются один раз и переиспользуются всеми вызовами.
+    """
+    plans = []
+
+    base_topics = {
+        "backend": ["Python/Java", "Базы данных", "API", "Микросервисы"],
+        "frontend": ["JavaScript", "React/Vue", "CSS", "State Management"],
+        "devops": ["Docker", "Kubernetes", "CI/CD", "Мониторинг"],
+        "data": ["Python", "SQL", "Pandas", "ML основы"]
+    }
+
+    topics = base_topics.get(track, ["Программирование", "Алгоритмы", "Системный дизайн"])
+
+    for week in range(1, weeks + 1):
+        if week == 1:
+            title = "Основы и базовая теория"
+            description = f"Изучение основных концепций {track}"
+            week_topics = [topics[0], "Основы алгоритмов"]
+            tasks = ["Пройти базовый курс", "Решить 10 простых задач"]
+        elif week == 2:
+            title = "Углубление в технологии"
+            description = f"Погружение в ключевые технологии {track}"
+            week_topics = topics[1:3]
+            tasks = ["Изучить документацию", "Создать небольшой проект"]
+        elif week == 3:
+            title = "Практика и проекты"
+            description = "Применение знаний на практике"
+            week_topics = ["Практическое применение", "Оптимизация"]
+            tasks = ["Реализовать проект", "Оптимизировать код"]
+        else:
+            title = "Подготовка к собеседованию"
+            description = "Мокапы и повторение"
+            week_topics = ["Mock интервью", "Вопросы с собеседований"]
+            tasks = ["Пройти 3 mock интервью", "Повторить слабые темы"]
+
+        plans.append(LearningGoal(
+            week=week,
+            title=title,
+            description=description,
+            topics=week_topics,
+            tasks=tasks,
+            resources=["LeetCode", "Habr", "Official Documentation"],
+            estimated_hours=10,
+            success_criteria=[f"Завершить задачи недели {week}"]
+        ))
+
+    return tuple(plans)
+
+
+def _fmt_bullets(items: List[str]) -> str:
+    return "".join(f"\n      • {item}" for item in items)
+
+
+def _fmt_week(goal: LearningGoal) -> str:
+    """Блок одной недели плана — одной строкой, без построчной сборки списка"""
+    # Показываем только 3 ресурса
+    resources = f"   🔗 **Ресурсы:**{_fmt_bullets(goal.resources[:3])}\n\n" if goal.resources else ""
+
+    return (
+        f"**🎯 Неделя {goal.week}: {goal.title}**\n"
+        f"   {goal.description}\n"
+        f"   ⏰ Часов: {goal.estimated_hours}\n"
+        "\n"
+        f"   📚 **Темы:**{_fmt_bullets(goal.topics)}\n"
+        "\n"
+        f"   ✅ **Задачи:**{_fmt_bullets(goal.tasks)}\n"
+        "\n"
+        f"{resources}"
+        f"   🎯 **Критерии успеха:**{_fmt_bullets(goal.success_criteria)}\n"
+    )
+
+
+# ===============================
+#  Основной класс Planner с RAG
+# ===============================
+class PlannerAgent:
+    def __init__(self, use_rag: bool = True, use_cache: bool = True):
+        self.use_rag = use_rag and RAG_AVAILABLE
+
+        # Разобранные ответы LLM. Ключ — описание пользователя, остальные параметры
+        # промпта (уровень, направление, срок, цели) — в namespace
+        self._llm_cache = SemanticCache(threshold=0.95) if use_cache and CACHE_AVAILABLE else None
+
+    @cached_property
+    def llm(self):
+        """Общий клиент GigaChat: соединение и токен переиспользуются между запросами"""
+        return get_gigachat("GigaChat")
+
+    def _cache_get(self, text: str, namespace: str):
+        """Ранее полученный результат LLM для похожего запроса или None"""
+        if self._llm_cache is None:
+            return None
+        try:
+            return self._llm_cache.get(str(text), namespace=namespace)
+        except Exception as e:
+            # Сбой кэша — это промах, а не повод отдавать базовый план
+            print(f"⚠️  Ошибка кэша в Planner: {e}")
+            return None
+
+    def _cache_put(self, text: str, namespace: str, value):
+        """Сохраняет успешно разобранный результат LLM"""
+        if self._llm_cache is None:
+            return
+        try:
+            self._llm_cache.put(str(text), value, namespace=namespace)
+        except Exception as e:
+            print(f"⚠️  Ошибка кэша в Planner: {e}")
+
     def _get_rag_context_for_planning(self, user_text: str, level: str, track: str) -> Dict[str, str]:
         """Получает контекст из RAG для планирования"""
         if not self.use_rag:
-            return {"rag_context": "", "resources": ""}
+            return {"rag_context": ""}
 
         try:
-            # Поиск материалов по направлению и уровню
+            # Материалы по направлению и уровню; в промпт идут только они
             query = f"{track} {level} подготовка обучение материалы ресурсы"
-            context_chunks = retrieve_context(query, k=5)
-
-            # Поиск конкретных ресурсов
-            resources_query = f"{track} книги курсы статьи"
-            resources_results = search_similar(resources_query, k=3)
-
-            resources_list = []
-            for result in resources_results:
-                text = result.get('text', '')
-                if "ресурс" in text.lower() or "курс" in text.lower() or "книга" in text.lower():
-                    resources_list.append(text[:150] + "...")
+            context_chunks = retrieve_context(query, k=5, max_chars=250)
 
             return {
                 "rag_context": "\n".join([
-                    f"📚 Материал {i + 1}: {chunk[:250]}..."
+                    f"📚 Материал {i + 1}: {chunk}..."
                     for i, chunk in enumerate(context_chunks)
-                ]),
-                "resources": "\n".join(resources_list[:3]) if resources_list else "Нет специфических ресурсов"
+                ])
             }
 
         except Exception as e:
             print(f"⚠️  Ошибка RAG в Planner: {e}")
-            return {"rag_context": "", "resources": ""}
+            return {"rag_context": ""}
 
     def _extract_json(self, text: str) -> dict:
         """Безопасно извлекает JSON из ответа"""
         # Очистка от Markdown
-        import re
-
         if text.startswith("```json"):
             text = text[7:].strip()
         elif text.startswith("```"):
@@ -179,31 +299,42 @@ class PlannerAgent:
         if text.endswith("```"):
             text = text[:-3].strip()
 
-        # Поиск JSON
-        json_match = re.search(r'\{.*\}', text, re.DOTALL)
-        if json_match:
+        # Поиск JSON — от первой "{" до последней "}", как и жадный r'\{.*\}', но без regex
+        start = text.find("{")
+        end = text.rfind("}")
+        if start != -1 and end > start:
             try:
-                return json.loads(json_match.group())
+                return json_loads(text[start:end + 1])
             except:
                 pass
 
         # Попытка распарсить весь текст
         try:
-            return json.loads(text)
+            return json_loads(text)
         except:
             raise ValueError("Не удалось извлечь JSON")
 
-    def make_plan(self, user_text: str, level: str = "junior",
-                  track: str = "backend", weeks: int = 4,
-                  goals: str = "") -> PlanResult:
-        """Создает план обучения"""
+    def _build_plan(self, data: dict, track: str, weeks: int, rag_used: bool) -> PlanResult:
+        """Собирает PlanResult из ответа модели"""
+        plan_items = _PLAN_ADAPTER.validate_python(data.get("plan", []))
 
-        # Получаем контекст из RAG
-        rag_context = self._get_rag_context_for_planning(user_text, level, track)
+        # Сортируем по неделям
+        plan_items.sort(key=lambda x: x.week)
+
+        return PlanResult(
+            plan=plan_items,
+            summary=data.get("summary", "План обучения создан"),
+            total_weeks=data.get("total_weeks", weeks),
+            total_hours=data.get("total_hours", weeks * 10),
+            focus_areas=data.get("focus_areas", [track, "алгоритмы", "системный дизайн"]),
+            rag_context_used=rag_used
+        )
 
-        # Выбираем промпт
+    def _planning_prompt(self, user_text: str, level: str, track: str, weeks: int,
+                         goals: str, rag_context: Dict[str, str]) -> Tuple[str, bool]:
+        """Выбирает промпт: с контекстом из RAG, если он есть. Возвращает (промпт, rag_used)"""
         if self.use_rag and rag_context["rag_context"]:
-            prompt = self.planning_prompt_with_rag.format(
+            prompt = _fmt_planning_with_rag(
                 user_text=user_text,
                 level=level,
                 track=track,
@@ -211,115 +342,101 @@ class PlannerAgent:
                 goals=goals,
                 rag_context=rag_context["rag_context"]
             )
-            rag_used = True
-        else:
-            prompt = self.planning_prompt_without_rag.format(
-                user_text=user_text,
-                level=level,
-                track=track,
-                weeks=weeks
-            )
-            rag_used = False
+            return prompt, True
+
+        prompt = _fmt_planning_without_rag(
+            user_text=user_text,
+            level=level,
+            track=track,
+            weeks=weeks
+        )
+        return prompt, False
+
+    @staticmethod
+    def _plan_namespace(level: str, track: str, weeks: int, goals: str, rag_used: bool) -> str:
+        # Контекст RAG зависит только от уровня и направления, поэтому в namespace его нет
+        return f"plan|{level}|{track}|{weeks}|{goals}|{rag_used}"
+
+    def _fallback_result(self, level: str, track: str, weeks: int) -> PlanResult:
+        """Базовый план, когда LLM не ответила или ответ не разобрался"""
+        return PlanResult(
+            plan=self._create_fallback_plan(level, track, weeks),
+            summary=f"Базовый план для {track} разработчика уровня {level}",
+            total_weeks=weeks,
+            total_hours=weeks * 10,
+            focus_areas=[track, "базовые концепции", "практика"],
+            rag_context_used=False
+        )
+
+    def make_plan(self, user_text: str, level: str = "junior",
+                  track: str = "backend", weeks: int = 4,
+                  goals: str = "") -> PlanResult:
+        """Создает план обучения"""
+
+        # Получаем контекст из RAG
+        rag_context = self._get_rag_context_for_planning(user_text, level, track)
+        prompt, rag_used = self._planning_prompt(user_text, level, track, weeks, goals, rag_context)
+
+        # План, составленный ранее для похожего описания.
+        # PlanResult неизменяемый, поэтому в кэше лежит готовый объект
+        cache_namespace = self._plan_namespace(level, track, weeks, goals, rag_used)
+        plan = self._cache_get(user_text, cache_namespace)
+        if plan is not None:
+            return plan
 
         try:
             # Генерируем план
-            response = self.llm.chat(prompt)
-            data = self._extract_json(response.choices[0].message.content)
-
-            # Создаем объекты LearningGoal
-            plan_items = []
-            for item_data in data.get("plan", []):
-                plan_items.append(LearningGoal(
-                    week=item_data.get("week", 1),
-                    title=item_data.get("title", f"Неделя {item_data.get('week', 1)}"),
-                    description=item_data.get("description", ""),
-                    topics=item_data.get("topics", []),
-                    tasks=item_data.get("tasks", []),
-                    resources=item_data.get("resources", []),
-                    estimated_hours=item_data.get("estimated_hours", 10),
-                    success_criteria=item_data.get("success_criteria", [])
-                ))
-
-            # Сортируем по неделям
-            plan_items.sort(key=lambda x: x.week)
+            data = self._extract_json(stream_until_json(self.llm, prompt))
+            plan = self._build_plan(data, track, weeks, rag_used)
+        except Exception as e:
+            print(f"❌ Ошибка создания плана: {e}")
+            return self._fallback_result(level, track, weeks)
 
-            return PlanResult(
-                plan=plan_items,
-                summary=data.get("summary", "План обучения создан"),
-                total_weeks=data.get("total_weeks", weeks),
-                total_hours=data.get("total_hours", weeks * 10),
-                focus_areas=data.get("focus_areas", [track, "алгоритмы", "системный дизайн"]),
-                rag_context_used=rag_used
-            )
+        self._cache_put(user_text, cache_namespace, plan)
+        return plan
+
+    async def amake_plan(self, user_text: str, level: str = "junior",
+                         track: str = "backend", weeks: int = 4,
+                         goals: str = "") -> PlanResult:
+        """
+        Асинхронная версия make_plan.
+
+        Поиск в RAG и проверка кэша идут параллельно: кэш проверяется для
+        namespace, который получится, если база знаний вернет контекст.
+        Если контекста не нашлось, кэш проверяется повторно для промпта без RAG.
+        """
+        expected_namespace = self._plan_namespace(level, track, weeks, goals, self.use_rag)
+        rag_context, plan = await asyncio.gather(
+            asyncio.to_thread(self._get_rag_context_for_planning, user_text, level, track),
+            asyncio.to_thread(self._cache_get, user_text, expected_namespace)
+        )
+        prompt, rag_used = self._planning_prompt(user_text, level, track, weeks, goals, rag_context)
+
+        cache_namespace = self._plan_namespace(level, track, weeks, goals, rag_used)
+        if cache_namespace != expected_namespace:
+            plan = await asyncio.to_thread(self._cache_get, user_text, cache_namespace)
+        if plan is not None:
+            return plan
 
+        try:
+            data = self._extract_json(await astream_until_json(self.llm, prompt))
+            plan = self._build_plan(data, track, weeks, rag_used)
         except Exception as e:
             print(f"❌ Ошибка создания плана: {e}")
+            return self._fallback_result(level, track, weeks)
 
-            # Fallback план
-            fallback_plan = self._create_fallback_plan(level, track, weeks)
-
-            return PlanResult(
-                plan=fallback_plan,
-                summary=f"Базовый план для {track} разработчика уровня {level}",
-                total_weeks=weeks,
-                total_hours=weeks * 10,
-                focus_areas=[track, "базовые концепции", "практика"],
-                rag_context_used=False
-            )
+        await asyncio.to_thread(self._cache_put, user_text, cache_namespace, plan)
+        return plan
 
     def _create_fallback_plan(self, level: str, track: str, weeks: int) -> List[LearningGoal]:
         """Создает базовый план на случай ошибки"""
-        plans = []
-
-        base_topics = {
-            "backend": ["Python/Java", "Базы данных", "API", "Микросервисы"],
-            "frontend": ["JavaScript", "React/Vue", "CSS", "State Management"],
-            "devops": ["Docker", "Kubernetes", "CI/CD", "Мониторинг"],
-            "data": ["Python", "SQL", "Pandas", "ML основы"]
-        }
-
-        topics = base_topics.get(track, ["Программирование", "Алгоритмы", "Системный дизайн"])
-
-        for week in range(1, weeks + 1):
-            if week == 1:
-                title = "Основы и базовая теория"
-                description = f"Изучение основных концепций {track}"
-                week_topics = [topics[0], "Основы алгоритмов"]
-                tasks = ["Пройти базовый курс", "Решить 10 простых задач"]
-            elif week == 2:
-                title = "Углубление в технологии"
-                description = f"Погружение в ключевые технологии {track}"
-                week_topics = topics[1:3]
-                tasks = ["Изучить документацию", "Создать небольшой проект"]
-            elif week == 3:
-                title = "Практика и проекты"
-                description = "Применение знаний на практике"
-                week_topics = ["Практическое применение", "Оптимизация"]
-                tasks = ["Реализовать проект", "Оптимизировать код"]
-            else:
-                title = "Подготовка к собеседованию"
-                description = "Мокапы и повторение"
-                week_topics = ["Mock интервью", "Вопросы с собеседований"]
-                tasks = ["Пройти 3 mock интервью", "Повторить слабые темы"]
-
-            plans.append(LearningGoal(
-                week=week,
-                title=title,
-                description=description,
-                topics=week_topics,
-                tasks=tasks,
-                resources=["LeetCode", "Habr", "Official Documentation"],
-                estimated_hours=10,
-                success_criteria=[f"Завершить задачи недели {week}"]
-            ))
-
-        return plans
+        return list(_fallback_template(track, weeks))
 
     def adjust_plan(self, original_plan: PlanResult, feedback: str) -> PlanResult:
         """Корректирует план на основе фидбека"""
         prompt = f"""
         Исходный план обучения:
-        {json.dumps([goal.dict() for goal in original_plan.plan], indent=2, ensure_ascii=False)}
+        {_PLAN_ADAPTER.dump_json(original_plan.plan, indent=2).decode()}
 
         Фидбек пользователя: {feedback}
 
@@ -329,12 +446,9 @@ class PlannerAgent:
         """
 
         try:
-            response = self.llm.chat(prompt)
-            data = self._extract_json(response.choices[0].message.content)
+            data = self._extract_json(stream_until_json(self.llm, prompt))
 
-            plan_items = []
-            for item_data in data.get("plan", []):
-                plan_items.append(LearningGoal(**item_data))
+            plan_items = _PLAN_ADAPTER.validate_python(data.get("plan", []))
 
             return PlanResult(
                 plan=plan_items,
@@ -351,44 +465,16 @@ class PlannerAgent:
 
     def format_plan_response(self, plan_result: PlanResult) -> str:
         """Форматирует план для вывода пользователю"""
-        response = [
-            "📋 **Ваш персонализированный план обучения**",
-            "",
-            f"📊 **Общая информация:**",
-            f"   • Недель: {plan_result.total_weeks}",
-            f"   • Всего часов: {plan_result.total_hours}",
-            f"   • Фокус-области: {', '.join(plan_result.focus_areas)}",
-            f"   • Использована база знаний: {'✅ Да' if plan_result.rag_context_used else '❌ Нет'}",
-            "",
-            f"📝 **Описание:** {plan_result.summary}",
-            ""
-        ]
-
-        for goal in plan_result.plan:
-            response.append(f"**🎯 Неделя {goal.week}: {goal.title}**")
-            response.append(f"   {goal.description}")
-            response.append(f"   ⏰ Часов: {goal.estimated_hours}")
-            response.append("")
-
-            response.append(f"   📚 **Темы:**")
-            for topic in goal.topics:
-                response.append(f"      • {topic}")
-            response.append("")
-
-            response.append(f"   ✅ **Задачи:**")
-            for task in goal.tasks:
-                response.append(f"      • {task}")
-            response.append("")
-
-            if goal.resources:
-                response.append(f"   🔗 **Ресурсы:**")
-                for resource in goal.resources[:3]:  # Показываем только 3 ресурса
-                    response.append(f"      • {resource}")
-                response.append("")
-
-            response.append(f"   🎯 **Критерии успеха:**")
-            for criterion in goal.success_criteria:
-                response.append(f"      • {criterion}")
-            response.append("")
-
-        return "\n".join(response)
\ No newline at end of file
+        header = (
+            "📋 **Ваш персонализированный план обучения**\n"
+            "\n"
+            "📊 **Общая информация:**\n"
+            f"   • Недель: {plan_result.total_weeks}\n"
+            f"   • Всего часов: {plan_result.total_hours}\n"
+            f"   • Фокус-области: {', '.join(plan_result.focus_areas)}\n"
+            f"   • Использована база знаний: {'✅ Да' if plan_result.rag_context_used else '❌ Нет'}\n"
+            "\n"
+            f"📝 **Описание:** {plan_result.summary}\n"
+        )
+
+        return "\n".join([header, *map(_fmt_week, plan_result.plan)])
\ No newline at end of file
@@ -3,18 +3,17 @@ import json
 import sys
 from pathlib import Path
 from pydantic import BaseModel
-from gigachat import GigaChat
-from dotenv import load_dotenv
-import os
 from typing import List, Optional, Dict
-import re
+from functools import cached_property
+
+from agents._llm import get_gigachat
 
 # Добавляем путь для импорта RAG
 sys.path.append(str(Path(__file__).resolve().parent.parent))
 
 # Импортируем RAG
 try:
-    from rag.retriever import retrieve_context, search_similar
+    from rag.retriever import retrieve_context
 
     RAG_AVAILABLE = True
 except ImportError:
@@ -22,14 +21,15 @@ except ImportError:
     RAG_AVAILABLE = False
 
 
-    def retrieve_context(query: str, k: int = 4) -> List[str]:
-        return []
-
-
-    def search_similar(query: str, k: int = 5) -> List[Dict]:
+    def retrieve_context(query: str, k: int = 4, agent: Optional[str] = None,
+                         max_chars: Optional[int] = None) -> List[str]:
         return []
 
-load_dotenv()
+# Быстрый парсер JSON (если установлен)
+try:
+    from orjson import loads as json_loads
+except ImportError:
+    json_loads = json.loads
 
 
 # ===============================
@@ -60,11 +60,6 @@ class ReviewResult(BaseModel):
 # ===============================
 class ReviewerAgent:
     def __init__(self, use_rag: bool = True):
-        self.llm = GigaChat(
-            credentials=os.getenv("GIGACHAT_CLIENT_SECRET"),
-            verify_ssl_certs=False
-        )
-
         self.use_rag = use_rag and RAG_AVAILABLE
 
         # Промпты
@@ -139,6 +134,11 @@ class ReviewerAgent:
         }}
         """
 
+    @cached_property
+    def llm(self):
+        """Общий клиент GigaChat: соединение и токен переиспользуются между запросами"""
+        return get_gigachat("GigaChat")
+
     def _get_rag_context_for_review(self, code: str, language: str, context: str) -> Dict[str, str]:
         """Получает контекст из RAG для code review"""
         if not self.use_rag:
@@ -148,21 +148,22 @@ class ReviewerAgent:
             # Извлекаем ключевые слова из кода и контекста
             keywords = self._extract_keywords_from_code(code, language)
 
-            # Ищем лучшие практики по языку
+            # Ищем только среди материалов ревьюера (примеры хорошего и плохого кода)
+            # Лучшие практики по языку
             query = f"{language} best practices code review patterns"
-            context_chunks = retrieve_context(query, k=4)
+            context_chunks = retrieve_context(query, k=4, agent="reviewer")
 
             # Ищем похожие решения
             similar_solutions = []
             if keywords:
                 for keyword in keywords[:3]:
-                    similar = search_similar(f"{keyword} {language} решение", k=1)
-                    for result in similar:
-                        similar_solutions.append(result.get('text', '')[:200] + "...")
+                    similar = retrieve_context(f"{keyword} {language} решение", k=1, agent="reviewer", max_chars=200)
+                    for text in similar:
+                        similar_solutions.append(text + "...")
 
             # Ищем антипаттерны
             anti_patterns_query = f"{language} anti-patterns common mistakes"
-            anti_patterns = retrieve_context(anti_patterns_query, k=2)
+            anti_patterns = retrieve_context(anti_patterns_query, k=2, agent="reviewer")
 
             combined_context = []
 
@@ -247,17 +248,18 @@ class ReviewerAgent:
         if text.endswith("```"):
             text = text[:-3].strip()
 
-        # Поиск JSON
-        json_match = re.search(r'\{.*\}', text, re.DOTALL)
-        if json_match:
+        # Поиск JSON — от первой "{" до последней "}", как и жадный r'\{.*\}', но без regex
+        start = text.find("{")
+        end = text.rfind("}")
+        if start != -1 and end > start:
             try:
-                return json.loads(json_match.group())
+                return json_loads(text[start:end + 1])
             except:
                 pass
 
         # Попытка распарсить весь текст
         try:
-            return json.loads(text)
+            return json_loads(text)
         except:
             raise ValueError("Не удалось извлечь JSON")
 
@@ -71,10 +71,9 @@ async def process_skills_description(
             assessor = agents["assessor"]
             print(f"✅ Используем существующий AssessorAgent из словаря")
         else:
-            # Fallback: создаем нового если не передан словарь
-            from agents.assessor_agent import AssessorAgent
-            assessor = AssessorAgent()
-            print(f"⚠️ Создаем новый AssessorAgent (agents не передан)")
+            # Fallback: общий экземпляр, если не передан словарь
+            from agents.assessor_agent import assessor
+            print(f"⚠️ Используем общий AssessorAgent (agents не передан)")
 
         # Получаем уровень и направление из контекста или используем по умолчанию
         level = context.get('level', 'junior')
@@ -84,12 +83,19 @@ async def process_skills_description(
         # Проверяем какие методы есть у твоего AssessorAgent
         if hasattr(assessor, 'create_assessment'):
             assessment = assessor.create_assessment(user_text, level, track)
+        elif hasattr(assessor, 'aassess'):
+            # Асинхронная оценка не блокирует обработку других сообщений
+            assessment = await assessor.aassess(
+                answer=user_text,
+                topics=["программирование", track, "алгоритмы"],
+                user_context={'level': level, 'track': track, 'user_id': user_id}
+            )
         elif hasattr(assessor, 'assess'):
             # Если метод называется assess
             assessment = assessor.assess(
                 answer=user_text,
                 topics=["программирование", track, "алгоритмы"],
-                user_context={'level': level, 'track': track}
+                user_context={'level': level, 'track': track, 'user_id': user_id}
             )
         else:
             # Если метод называется как-то иначе
@@ -3,7 +3,7 @@ from aiogram import Router, F
 from aiogram.types import Message
 import logging
 from bot.middleware.agents_middleware import get_coordinator
-from agents.assessor_agent import AssessorAgent
+from agents.assessor_agent import assessor as shared_assessor
 from agents.planner_agent import PlannerAgent
 from agents.interviewer_agent import InterviewerAgent
 
@@ -78,7 +78,7 @@ async def handle_assessment(message: Message, user_text: str, context: dict, rou
         await process_skills_description(message, user_text, context)
     else:
         # Это спонтанное описание навыков
-        assessor = AssessorAgent()
+        assessor = shared_assessor
 
         # Создаем базовую оценку
         level = context.get('level', 'junior')
@@ -48,10 +48,10 @@ async def cmd_interview(
 
     try:
         # Генерация вопросов через агента
-        interview_session = agents["interviewer"].start_interview(
+        interview_session = await agents["interviewer"].astart_interview(
             user.current_track,
             user.current_level,
-            session.id
+            session_id=session.id
         )
 
         if interview_session and interview_session.questions:
@@ -109,7 +109,7 @@ async def process_interview_answer(
     await message.answer("📊 Оцениваю ответ...")
 
     try:
-        score_result = agents["interviewer"].evaluate_answer(session_id, message.text)
+        score_result = await agents["interviewer"].aevaluate_answer(session_id, message.text)
 
         # Ответ
         feedback = f"""
@@ -137,7 +137,7 @@ async def process_interview_answer(
 
         else:
             # Завершаем интервью
-            summary = agents["interviewer"].end_interview(session_id)
+            summary = await agents["interviewer"].aend_interview(session_id)
 
             final_response = f"""
 🎉 *Собеседование завершено!*
@@ -159,12 +159,30 @@ async def process_plan_time(
             'available_time': time_text
         }
 
+        # Уровень в формате для planner (junior/middle/senior)
+        level_mapping = {
+            "Начинающий": "junior",
+            "Средний": "middle",
+            "Продвинутый": "senior"
+        }
+        plan_params = {
+            'user_text': f"Хочу изучить: {user_goal}. {plan_context['experience']}. "
+                         f"Время: {plan_context['available_time']}",
+            'level': level_mapping.get(user_level, "middle"),
+            'track': plan_context['track'],
+            'weeks': plan_context['weeks'],
+            'goals': plan_context['goals']
+        }
+
         # Пробуем создать план через агента
         plan_result = None
 
         # Проверяем разные методы вызова
-        if hasattr(planner_agent, 'make_plan'):
-            plan_result = planner_agent.make_plan(plan_context)
+        if hasattr(planner_agent, 'amake_plan'):
+            # Асинхронное создание плана не блокирует обработку других сообщений
+            plan_result = await planner_agent.amake_plan(**plan_params)
+        elif hasattr(planner_agent, 'make_plan'):
+            plan_result = planner_agent.make_plan(**plan_params)
         elif hasattr(planner_agent, 'create_plan'):
             plan_result = planner_agent.create_plan(plan_context)
         elif hasattr(planner_agent, 'process_query'):
@@ -223,6 +223,13 @@ async def main():
         logger.warning("⚠️  Агенты не доступны, работаем в ограниченном режиме")
         agents_dict = {}
 
+    # Токен GigaChat получаем до первого запроса пользователя, не блокируя event loop
+    try:
+        from agents._llm import awarm_gigachat
+        await awarm_gigachat()
+    except Exception as e:
+        logger.error(f"❌ Ошибка подключения к GigaChat: {e}")
+
     # 4. Добавляем middleware для передачи агентов
     if MIDDLEWARE_AVAILABLE and agents_dict.get("coordinator"):
         try:
@@ -300,6 +307,12 @@ async def on_shutdown():
     except Exception as e:
         logger.error(f"❌ Ошибка при закрытии бота: {e}")
 
+    try:
+        from agents._llm import aclose_gigachat
+        await aclose_gigachat()
+    except Exception as e:
+        logger.error(f"❌ Ошибка при закрытии клиентов GigaChat: {e}")
+
 
 # =========================
 # Запуск бота
@@ -11,6 +11,7 @@ COLLECTION_NAME = "interprep_knowledge"
 
 # Кэш для быстродействия
 _vectorstore = None
+_embedder = None
 
 
 def get_vectorstore():
@@ -30,7 +31,9 @@ def get_vectorstore():
         )
 
         try:
-            _vectorstore = client.get_collection(COLLECTION_NAME)
+            # Коллекция считает эмбеддинги запросов тем же экземпляром модели,
+            # что и семантический кэш, — одна ONNX-сессия на процесс вместо двух
+            _vectorstore = client.get_collection(COLLECTION_NAME, embedding_function=get_embedder())
         except:
             raise ValueError(
                 f"Коллекция '{COLLECTION_NAME}' не найдена.\n"
@@ -40,11 +43,35 @@ def get_vectorstore():
     return _vectorstore
 
 
+def get_embedder():
+    """
+    Возвращает модель эмбеддингов, которой проиндексирована база знаний.
+
+    Один экземпляр на процесс: его используют и поиск по коллекции,
+    и семантический кэш агентов.
+    """
+    global _embedder
+
+    if _embedder is None:
+        from chromadb.utils import embedding_functions
+
+        # Та же модель (all-MiniLM-L6-v2, ONNX), что ChromaDB использует по умолчанию при ingest
+        _embedder = embedding_functions.DefaultEmbeddingFunction()
+
+    return _embedder
+
+
+def embed_texts(texts: List[str]) -> List[List[float]]:
+    """Считает эмбеддинги для списка текстов одним батчем"""
+    return get_embedder()(texts)
+
+
 def retrieve_context(
         query: str,
         k: int = 3,
         filter_by: Optional[Dict] = None,
-        agent: Optional[str] = None
+        agent: Optional[str] = None,
+        max_chars: Optional[int] = None
 ) -> List[str]:
     """
     Ищет релевантные документы
@@ -54,6 +81,7 @@ def retrieve_context(
         k: Количество результатов
         filter_by: Дополнительные фильтры
         agent: Имя агента для фильтрации
+        max_chars: Обрезать каждый документ до этой длины (None — целиком)
 
     Returns:
         Список текстов документов
@@ -70,11 +98,14 @@ def retrieve_context(
             query_texts=[query],
             n_results=k,
             where=where_filter if where_filter else None,
-            include=["documents", "metadatas"]
+            include=["documents"]
         )
 
         if results and results['documents']:
-            return results['documents'][0]
+            documents = results['documents'][0]
+            if max_chars is not None:
+                return [doc[:max_chars] for doc in documents]
+            return documents
         return []
 
     except Exception as e:
@@ -82,6 +113,53 @@ def retrieve_context(
         return []
 
 
+def retrieve_context_batch(
+        queries: List[str],
+        ks: List[int],
+        filter_by: Optional[Dict] = None,
+        agent: Optional[str] = None
+) -> List[List[str]]:
+    """
+    Ищет документы сразу по нескольким запросам
+
+    Все запросы кодируются моделью эмбеддингов одним батчем и уходят
+    в векторное хранилище одним вызовом query.
+
+    Args:
+        queries: Поисковые запросы
+        ks: Количество результатов для каждого запроса
+        filter_by: Дополнительные фильтры
+        agent: Имя агента для фильтрации
+
+    Returns:
+        Списки текстов документов, по одному на запрос
+    """
+    if not queries:
+        return []
+
+    try:
+        vs = get_vectorstore()
+
+        where_filter = filter_by or {}
+        if agent:
+            where_filter["agent"] = agent
+
+        results = vs.query(
+            query_texts=queries,
+            n_results=max(ks),
+            where=where_filter if where_filter else None,
+            include=["documents"]
+        )
+
+        if results and results['documents']:
+            return [docs[:k] for docs, k in zip(results['documents'], ks)]
+        return [[] for _ in queries]
+
+    except Exception as e:
+        print(f"⚠️  Ошибка поиска в базе знаний: {e}")
+        return [[] for _ in queries]
+
+
 def retrieve_for_agent(agent_name: str, query: str, k: int = 3) -> List[str]:
     """
     Ищет контекст для конкретного агента
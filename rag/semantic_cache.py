@@ -0,0 +1,190 @@
+# rag/semantic_cache.py
+import functools
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Callable, Dict, List, Optional
+
+import numpy as np
+
+
+# Сколько строк матрицы переводится в float32 за один шаг поиска
+_SCAN_BLOCK = 4096
+
+
+def _normalize(text: str) -> str:
+    return " ".join(text.lower().split())
+
+
+def _quantize(vector: np.ndarray):
+    """Симметричное квантование в int8 с масштабом на вектор: vector ≈ q * scale"""
+    peak = float(np.abs(vector).max())
+    scale = peak / 127 if peak else 1.0
+    return np.round(vector / scale).astype(np.int8), scale
+
+
+class SemanticCache:
+    """
+    LRU-кэш результатов по смысловой близости запроса.
+
+    Сначала проверяется точное совпадение нормализованного текста, затем —
+    косинусная близость эмбеддинга запроса ко всем сохраненным векторам.
+    Векторы хранятся в int8 с масштабом на строку — в 4 раза меньше памяти,
+    чем float32; запрос остается в float32, так что погрешность косинуса
+    порядка 1e-3 и на порог 0.95 практически не влияет. Поиск по близости идет только внутри
+    namespace, чтобы, например, ответы junior и middle не подменяли друг друга.
+    Записи старше ttl считаются промахом.
+    """
+
+    def __init__(
+            self,
+            embed_fn: Optional[Callable[[List[str]], Any]] = None,
+            threshold: float = 0.95,
+            max_bytes: int = 100 * 1024 * 1024,
+            ttl: float = 3600
+    ):
+        self.threshold = threshold
+        self.max_bytes = max_bytes
+        self.ttl = ttl
+
+        self._embed_fn = embed_fn
+        self._lock = threading.Lock()
+
+        # key -> [slot, value, created_at]; порядок = порядок LRU
+        self._entries: "OrderedDict[str, list]" = OrderedDict()
+        # Строки матрицы _vectors[:len(_slot_keys)] соответствуют ключам _slot_keys
+        self._vectors: Optional[np.ndarray] = None
+        self._scales: Optional[np.ndarray] = None
+        self._namespaces: Optional[np.ndarray] = None
+        self._slot_keys: List[str] = []
+        self._capacity = 0
+
+        self.hits = 0
+        self.misses = 0
+
+        self._embed = functools.lru_cache(maxsize=256)(self._embed_uncached)
+
+    def _embed_uncached(self, text: str) -> Optional[np.ndarray]:
+        try:
+            if self._embed_fn is None:
+                # Без chromadb кэш выключается: get — промах, put ничего не делает
+                from rag.retriever import embed_texts
+                self._embed_fn = embed_texts
+
+            vector = np.asarray(self._embed_fn([text])[0], dtype=np.float32)
+        except Exception as e:
+            print(f"⚠️  Семантический кэш: не удалось посчитать эмбеддинг: {e}")
+            return None
+
+        norm = np.linalg.norm(vector)
+        return vector / norm if norm else vector
+
+    def _is_fresh(self, entry: list) -> bool:
+        return time.monotonic() - entry[2] < self.ttl
+
+    def _remove(self, key: str):
+        """Удаляет запись, перенося последний вектор на освободившееся место"""
+        slot = self._entries.pop(key)[0]
+        last = len(self._slot_keys) - 1
+
+        if slot != last:
+            moved_key = self._slot_keys[last]
+            self._vectors[slot] = self._vectors[last]
+            self._scales[slot] = self._scales[last]
+            self._namespaces[slot] = self._namespaces[last]
+            self._slot_keys[slot] = moved_key
+            self._entries[moved_key][0] = slot
+
+        self._slot_keys.pop()
+
+    def get(self, text: str, namespace: str = "") -> Optional[Any]:
+        """Возвращает сохраненный результат для похожего запроса или None"""
+        text = _normalize(text)
+        key = f"{namespace}\0{text}"
+
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None:
+                if self._is_fresh(entry):
+                    self._entries.move_to_end(key)
+                    self.hits += 1
+                    return entry[1]
+                self._remove(key)
+
+            if not self._slot_keys:
+                self.misses += 1
+                return None
+
+        query = self._embed(text)
+        if query is None:
+            self.misses += 1
+            return None
+
+        with self._lock:
+            count = len(self._slot_keys)
+            if count:
+                similarities = np.empty(count, dtype=np.float32)
+                for start in range(0, count, _SCAN_BLOCK):
+                    end = min(start + _SCAN_BLOCK, count)
+                    similarities[start:end] = self._vectors[start:end].astype(np.float32) @ query
+                similarities *= self._scales[:count]
+                similarities[self._namespaces[:count] != hash(namespace)] = -1.0
+                best = int(np.argmax(similarities))
+
+                if similarities[best] >= self.threshold:
+                    best_key = self._slot_keys[best]
+                    entry = self._entries[best_key]
+
+                    if self._is_fresh(entry):
+                        self._entries.move_to_end(best_key)
+                        self.hits += 1
+                        return entry[1]
+                    self._remove(best_key)
+
+            self.misses += 1
+            return None
+
+    def put(self, text: str, value: Any, namespace: str = ""):
+        """Сохраняет результат для запроса"""
+        text = _normalize(text)
+        key = f"{namespace}\0{text}"
+        vector = self._embed(text)
+        if vector is None:
+            return
+
+        with self._lock:
+            if self._vectors is None:
+                # int8-вектор + масштаб float32 + хэш namespace на каждую запись
+                row_bytes = vector.shape[0] + 4 + 8
+                self._capacity = max(1, self.max_bytes // row_bytes)
+                self._vectors = np.empty((self._capacity, vector.shape[0]), dtype=np.int8)
+                self._scales = np.empty(self._capacity, dtype=np.float32)
+                self._namespaces = np.empty(self._capacity, dtype=np.int64)
+
+            if key in self._entries:
+                self._remove(key)
+
+            while len(self._slot_keys) >= self._capacity:
+                self._remove(next(iter(self._entries)))
+
+            slot = len(self._slot_keys)
+            self._vectors[slot], self._scales[slot] = _quantize(vector)
+            self._namespaces[slot] = hash(namespace)
+            self._slot_keys.append(key)
+            self._entries[key] = [slot, value, time.monotonic()]
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self._slot_keys.clear()
+            self._embed.cache_clear()
+
+    def stats(self) -> Dict[str, Any]:
+        """Статистика попаданий для мониторинга"""
+        total = self.hits + self.misses
+        return {
+            "entries": len(self._entries),
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": round(self.hits / total, 3) if total else 0.0
+        }
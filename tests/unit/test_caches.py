@@ -0,0 +1,108 @@
+# tests/unit/test_caches.py
+import sys
+
+import numpy as np
+import pytest
+
+from agents import _result_cache
+from agents._result_cache import ResultCache
+from rag import semantic_cache
+from rag.semantic_cache import SemanticCache
+
+# Фиксированные эмбеддинги: "python" и "пайтон" почти совпадают, "sql" — другое направление
+_VECTORS = {
+    "python": [1.0, 0.0, 0.0],
+    "пайтон": [0.99, 0.05, 0.0],
+    "sql": [0.0, 1.0, 0.0],
+}
+
+
+def fake_embed(texts):
+    return [np.asarray(_VECTORS[text], dtype=np.float32) for text in texts]
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    """Управляемое время для проверки TTL обоих кэшей"""
+    now = [1000.0]
+    monkeypatch.setattr(semantic_cache.time, "monotonic", lambda: now[0])
+    monkeypatch.setattr(_result_cache.time, "monotonic", lambda: now[0])
+    return now
+
+
+class TestSemanticCache:
+    """Тесты семантического кэша: близость, namespace, TTL."""
+
+    def test_similar_query_hits(self):
+        cache = SemanticCache(embed_fn=fake_embed, threshold=0.95)
+        cache.put("python", "вопросы")
+
+        assert cache.get("python") == "вопросы"
+        assert cache.get("пайтон") == "вопросы"
+        assert cache.get("sql") is None
+
+    def test_namespaces_are_isolated(self):
+        cache = SemanticCache(embed_fn=fake_embed, threshold=0.95)
+        cache.put("python", "junior", namespace="junior")
+        cache.put("python", "middle", namespace="middle")
+
+        assert cache.get("python", namespace="junior") == "junior"
+        assert cache.get("пайтон", namespace="middle") == "middle"
+        assert cache.get("python", namespace="senior") is None
+
+    def test_expired_entry_is_a_miss(self, clock):
+        cache = SemanticCache(embed_fn=fake_embed, ttl=10)
+        cache.put("python", "вопросы")
+
+        clock[0] += 9
+        assert cache.get("пайтон") == "вопросы"
+
+        clock[0] += 2
+        assert cache.get("python") is None
+        assert cache.get("пайтон") is None
+        assert cache.stats()["entries"] == 0
+
+    def test_without_retriever_cache_is_disabled(self, monkeypatch):
+        # Импорт rag.retriever падает, как без установленной chromadb
+        monkeypatch.setitem(sys.modules, "rag.retriever", None)
+        cache = SemanticCache()
+        cache.put("python", "вопросы")
+
+        assert cache.get("python") is None
+        assert cache.stats()["entries"] == 0
+
+
+class TestResultCache:
+    """Тесты точного кэша результатов LLM."""
+
+    def test_exact_key_up_to_case_and_spaces(self):
+        cache = ResultCache()
+        cache.put(("вопрос", "junior", "Список изменяемый"), "оценка")
+
+        assert cache.get(("вопрос", "junior", "  список   ИЗМЕНЯЕМЫЙ ")) == "оценка"
+        assert cache.get(("вопрос", "junior", "Список изменяемый!")) is None
+        assert cache.get(("другой вопрос", "junior", "Список изменяемый")) is None
+
+    def test_parts_do_not_merge(self):
+        cache = ResultCache()
+        cache.put(("a b", "c"), 1)
+
+        assert cache.get(("a", "b c")) is None
+
+    def test_expired_entry_is_a_miss(self, clock):
+        cache = ResultCache(ttl=10)
+        cache.put(("key",), "value")
+
+        clock[0] += 11
+        assert cache.get(("key",)) is None
+
+    def test_evicts_least_recently_used(self):
+        cache = ResultCache(maxsize=2)
+        cache.put(("a",), 1)
+        cache.put(("b",), 2)
+        cache.get(("a",))
+        cache.put(("c",), 3)
+
+        assert cache.get(("b",)) is None
+        assert cache.get(("a",)) == 1
+        assert cache.get(("c",)) == 3
@@ -0,0 +1,83 @@
+# tests/unit/test_llm_stream.py
+import asyncio
+from types import SimpleNamespace
+
+import pytest
+
+from agents._llm import _json_complete, astream_until_json, stream_until_json
+
+
+def _chunk(content):
+    return SimpleNamespace(choices=[SimpleNamespace(delta=SimpleNamespace(content=content))])
+
+
+class FakeStreamingLLM:
+    """Отдает ответ заданными кусками и считает, сколько кусков прочитано"""
+
+    def __init__(self, parts):
+        self.parts = parts
+        self.read = 0
+
+    def stream(self, prompt):
+        for part in self.parts:
+            self.read += 1
+            yield _chunk(part)
+
+    async def astream(self, prompt):
+        for part in self.parts:
+            self.read += 1
+            yield _chunk(part)
+
+
+class TestJsonComplete:
+    """Определение конца JSON-объекта в потоке."""
+
+    @pytest.mark.parametrize("text", [
+        '{"score": 80}',
+        'Вот оценка: {"score": 80, "tags": ["a"]}',
+        '```json\n{"a": {"b": 1}}',
+    ])
+    def test_complete_object(self, text):
+        assert _json_complete([text], text)
+
+    @pytest.mark.parametrize("text", [
+        '{"scores": {"theory": 8}',
+        '{"comment": "скобка } внутри строки',
+        '[{"week": 1}',
+        'без объекта }',
+    ])
+    def test_truncated_or_not_an_object(self, text):
+        assert not _json_complete([text], text)
+
+    def test_checked_only_on_closing_brace(self):
+        assert not _json_complete(['{"a": 1}', " текст"], " текст")
+
+
+class TestStreamUntilJson:
+    """Чтение потока до конца JSON-объекта."""
+
+    PARTS = ['Ответ: {"score": 7', '0, "x": {"a": 1}', '}', " пояснение", " еще"]
+
+    def test_stops_after_object(self):
+        llm = FakeStreamingLLM(self.PARTS)
+
+        assert stream_until_json(llm, "prompt") == 'Ответ: {"score": 70, "x": {"a": 1}}'
+        assert llm.read == 3
+
+    def test_reads_truncated_reply_to_the_end(self):
+        llm = FakeStreamingLLM(['{"score": ', "70, ", '"x": {"a": 1}'])
+
+        assert stream_until_json(llm, "prompt") == '{"score": 70, "x": {"a": 1}'
+        assert llm.read == 3
+
+    def test_array_reply_is_read_whole(self):
+        llm = FakeStreamingLLM(['[{"week": 1}', ', {"week": 2}', "]"])
+
+        assert stream_until_json(llm, "prompt") == '[{"week": 1}, {"week": 2}]'
+        assert llm.read == 3
+
+    def test_async_stops_after_object(self):
+        llm = FakeStreamingLLM(self.PARTS)
+
+        assert asyncio.run(astream_until_json(llm, "prompt")) == 'Ответ: {"score": 70, "x": {"a": 1}}'
+        assert llm.read == 3
@@ -0,0 +1,110 @@
+# tests/unit/test_session_store.py
+import asyncio
+from dataclasses import dataclass
+
+import pytest
+
+from agents import _session_store
+from agents._session_store import MemorySessionStore
+
+
+@dataclass
+class FakeSession:
+    id: object
+    value: int = 0
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    """Управляемое время для проверки TTL"""
+    now = [1000.0]
+    monkeypatch.setattr(_session_store.time, "monotonic", lambda: now[0])
+    return now
+
+
+class TestMemorySessionStore:
+    """Тесты хранилища сессий в памяти: TTL, вытеснение, шарды."""
+
+    def test_put_get_delete(self):
+        store = MemorySessionStore()
+        session = FakeSession("s1", 1)
+
+        store.put(session)
+        assert store.get("s1") is session
+
+        store.delete("s1")
+        assert store.get("s1") is None
+
+    def test_expired_session_is_gone(self, clock):
+        store = MemorySessionStore(ttl=10)
+        store.put(FakeSession("s1"))
+
+        clock[0] += 9
+        assert store.get("s1") is not None
+
+        clock[0] += 2
+        assert store.get("s1") is None
+
+    def test_put_refreshes_ttl(self, clock):
+        store = MemorySessionStore(ttl=10)
+        session = FakeSession("s1")
+        store.put(session)
+
+        clock[0] += 8
+        store.put(session)
+        clock[0] += 8
+        assert store.get("s1") is session
+
+    def test_evicts_least_recently_put(self):
+        store = MemorySessionStore(maxsize=2, shards=1)
+        store.put(FakeSession("a"))
+        store.put(FakeSession("b"))
+        # Повторный put переставляет "a" в конец очереди
+        store.put(FakeSession("a"))
+        store.put(FakeSession("c"))
+
+        assert store.get("b") is None
+        assert store.get("a") is not None
+        assert store.get("c") is not None
+
+    def test_eviction_is_per_shard(self):
+        store = MemorySessionStore(maxsize=4, shards=2)
+        ids = [f"s{i}" for i in range(50)]
+        for session_id in ids:
+            store.put(FakeSession(session_id))
+
+        for sessions, _ in store._shards:
+            assert len(sessions) <= 2
+        assert sum(store.get(session_id) is not None for session_id in ids) == 4
+
+    def test_shard_routing_is_stable(self):
+        store = MemorySessionStore(shards=8)
+        for i in range(20):
+            store.put(FakeSession(f"s{i}"))
+
+        for index, (sessions, _) in enumerate(store._shards):
+            for session_id in sessions:
+                assert hash(session_id) % 8 == index
+
+    def test_int_and_str_ids_are_the_same_session(self):
+        store = MemorySessionStore()
+        session = FakeSession(42)
+        store.put(session)
+
+        assert store.get("42") is session
+        assert store.get(42) is session
+
+        store.delete(42)
+        assert store.get("42") is None
+
+    def test_async_methods(self):
+        store = MemorySessionStore()
+        session = FakeSession(7)
+
+        async def scenario():
+            await store.aput(session)
+            found = await store.aget("7")
+            await store.adelete(7)
+            return found, await store.aget(7)
+
+        assert asyncio.run(scenario()) == (session, None)
@@ -0,0 +1,31 @@
+# tests/unit/test_templates.py
+import pytest
+
+from agents._templates import compile_template
+
+
+class TestCompileTemplate:
+    """Скомпилированный шаблон должен давать тот же текст, что и str.format."""
+
+    @pytest.mark.parametrize("template, values", [
+        ("", {}),
+        ("без полей", {}),
+        ("{a}", {"a": "x"}),
+        ("{a} и {b}, снова {a}", {"a": 1, "b": None}),
+        ('JSON: {{"score": {score}}}\n', {"score": 42}),
+        ("кавычки ' \" и слеш \\ {x}", {"x": [1, 2]}),
+        ("{str} {_fmt} {format}", {"str": "s", "_fmt": "f", "format": 3.5}),
+    ])
+    def test_matches_str_format(self, template, values):
+        assert compile_template(template)(**values) == template.format(**values)
+
+    def test_field_names_do_not_collide_with_internals(self):
+        assert compile_template("{_s0} hi {x}")(_s0="Z", x="X") == "Z hi X"
+
+    @pytest.mark.parametrize("template", ["{class}", "{0}", "{}", "{a.b}", "{a!r}", "{a:>5}"])
+    def test_unsupported_fields(self, template):
+        with pytest.raises(ValueError):
+            compile_template(template)
+
+    def test_compiled_once(self):
+        assert compile_template("{a}-{b}") is compile_template("{a}-{b}")